@@ -1,3 +1,5 @@
 from pathlib import Path
 
-CURRENT_DIRECTORY = Path.cwd()
\ No newline at end of file
+CURRENT_DIRECTORY = Path.cwd()
+# Word -> relative path index kept at the root of sharded download folders
+OUTPUT_INDEX_NAME = ".pf-index.tsv"
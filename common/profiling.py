@@ -0,0 +1,250 @@
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+log = logging.getLogger("pf.profiling")
+
+# Pipeline methods wrapped with per-stage memory tracking.
+# Figures are inclusive: `download_audio` also counts what its nested stages allocate.
+PROFILED_STAGES = (
+    "fetch_word_data",
+    "parse_word_response",
+    "extract_candidate",
+    "normalize_audio_url",
+    "fetch_audio",
+    "download_audio",
+)
+TOP_STATS = 25
+TOP_ALLOCATORS = 10
+# Deep enough to reach the stage's frame from allocations inside requests or bs4
+TRACEMALLOC_FRAMES = 64
+# Keep the profiler's own bookkeeping out of the allocation tables
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+)
+
+
+class StageAllocations:
+    """
+    Memory per pipeline stage.
+
+    While profiling, every stage call records its net traced memory from
+    `tracemalloc.get_traced_memory()` deltas. At the end, `attribute()` splits
+    the memory still held by allocation site and by the stages found in each
+    allocation's traceback, which gives the top allocators per stage.
+
+    Reading the counter is cheap enough to leave the CPU profile undistorted, but
+    traced memory is process-wide: the figures only isolate a stage when words
+    run one at a time, as they do under `profile_pipeline`. If stages run on
+    several threads anyway, the report says so.
+    """
+
+    def __init__(self):
+        self.calls: dict[str, int] = defaultdict(int)
+        self.net: dict[str, int] = defaultdict(int)
+        self.largest: dict[str, int] = defaultdict(int)
+        self.threads: set[int] = set()
+        self._lock = threading.Lock()
+        # Stage -> (file, first line, last line) of the method's code
+        self.code_ranges: dict[str, tuple[str, int, int]] = {}
+        self.live_sizes: dict[str, dict[tuple, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self.live_counts: dict[str, dict[tuple, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+
+    def locate(self, pipeline) -> None:
+        """Note where the pipeline's stage methods are defined, to spot them in tracebacks"""
+        for stage in PROFILED_STAGES:
+            code = getattr(type(pipeline), stage).__code__
+            lines = [line for _, _, line in code.co_lines() if line is not None]
+            self.code_ranges[stage] = (code.co_filename, min(lines), max(lines))
+
+    def _stages_in(self, traceback: tracemalloc.Traceback) -> set[str]:
+        stages = set()
+        for frame in traceback:
+            for stage, (filename, first, last) in self.code_ranges.items():
+                if frame.filename == filename and first <= frame.lineno <= last:
+                    stages.add(stage)
+        return stages
+
+    def attribute(self, snapshot: tracemalloc.Snapshot) -> None:
+        """Group the memory held in `snapshot` by stage and allocation site"""
+        for stat in snapshot.statistics("traceback"):
+            site = stat.traceback[-1]
+            key = (site.filename, site.lineno)
+            for stage in self._stages_in(stat.traceback):
+                self.live_sizes[stage][key] += stat.size
+                self.live_counts[stage][key] += stat.count
+
+    def wrap(self, stage: str, method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            before, _ = tracemalloc.get_traced_memory()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                after, _ = tracemalloc.get_traced_memory()
+                self.record(stage, after - before)
+
+        return wrapper
+
+    def record(self, stage: str, delta: int) -> None:
+        with self._lock:
+            self.calls[stage] += 1
+            self.net[stage] += delta
+            self.largest[stage] = max(self.largest[stage], delta)
+            self.threads.add(threading.get_ident())
+
+    def format(self, limit: int = TOP_ALLOCATORS) -> str:
+        lines = []
+        if len(self.threads) > 1:
+            lines.append(
+                f"Note: stages ran on {len(self.threads)} threads, figures include "
+                "allocations of concurrent words."
+            )
+        for stage in PROFILED_STAGES:
+            calls = self.calls.get(stage)
+            if not calls:
+                continue
+            lines.append(
+                f"  {stage:<20} calls: {calls:>6}  "
+                f"net {self.net[stage] / 1024:>10.1f} KiB  "
+                f"avg {self.net[stage] / calls / 1024:>8.1f} KiB  "
+                f"largest {self.largest[stage] / 1024:>8.1f} KiB"
+            )
+            top = sorted(
+                self.live_sizes[stage].items(), key=lambda i: i[1], reverse=True
+            )
+            for (filename, lineno), size in top[:limit]:
+                count = self.live_counts[stage][(filename, lineno)]
+                lines.append(
+                    f"    {size / 1024:>10.1f} KiB  {count:>7} blocks  "
+                    f"{filename}:{lineno}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _instrument(pipeline, allocations: StageAllocations) -> None:
+    """Shadow the pipeline's stage methods with instance-level tracking wrappers"""
+    for stage in PROFILED_STAGES:
+        method = getattr(pipeline, stage)
+        setattr(pipeline, stage, allocations.wrap(stage, method))
+
+
+def _restore(pipeline) -> None:
+    for stage in PROFILED_STAGES:
+        pipeline.__dict__.pop(stage, None)
+
+
+@contextmanager
+def profile_pipeline(pipeline, output_dir: Path) -> Iterator[None]:
+    """
+    Profile everything run inside the block with cProfile and tracemalloc.
+
+    cProfile only follows the thread that enabled it, so the pipeline runs its
+    words one at a time on the calling thread while profiling, whatever the
+    number of workers. Audio validation runs in-process for the same reason.
+
+    Writes two files to `output_dir`:
+        - `profile_<timestamp>.prof`: cProfile stats, loadable with `pstats` or snakeviz.
+        - `profile_<timestamp>.txt`: cumulative/total time tables, top allocators
+          overall, and net memory and top allocators per pipeline stage
+          (see `StageAllocations`).
+
+    Args:
+        pipeline: The `AudioPipeline` instance whose stages should be tracked.
+        output_dir: Directory for the report files (usually the log directory).
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    stats_path = output_dir / f"profile_{stamp}.prof"
+    report_path = output_dir / f"profile_{stamp}.txt"
+
+    allocations = StageAllocations()
+    allocations.locate(pipeline)
+    _instrument(pipeline, allocations)
+    # cProfile and the stage counters only follow the thread that enabled them
+    inline_tasks, pipeline.inline_tasks = pipeline.inline_tasks, True
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    start_snapshot = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        end_snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not already_tracing:
+            tracemalloc.stop()
+        _restore(pipeline)
+        pipeline.inline_tasks = inline_tasks
+
+        profiler.dump_stats(stats_path)
+        # Filtered once here, filtering is too slow to do while profiling
+        end_snapshot = end_snapshot.filter_traces(SNAPSHOT_FILTERS)
+        allocations.attribute(end_snapshot)
+        report = _build_report(
+            profiler,
+            allocations,
+            end_snapshot.compare_to(
+                start_snapshot.filter_traces(SNAPSHOT_FILTERS), "lineno"
+            ),
+            elapsed,
+            current,
+            peak,
+        )
+        report_path.write_text(report, encoding="utf-8")
+        log.info(f'Profile report saved to "{report_path}"')
+        log.debug(f'Profile stats saved to "{stats_path}"')
+
+
+def _build_report(
+    profiler: cProfile.Profile,
+    allocations: StageAllocations,
+    overall: list[tracemalloc.StatisticDiff],
+    elapsed: float,
+    current: int,
+    peak: int,
+) -> str:
+    out = io.StringIO()
+    out.write(f"Wall time: {elapsed:.3f}s\n")
+    out.write(
+        f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n"
+    )
+
+    for sort_key in (pstats.SortKey.CUMULATIVE, pstats.SortKey.TIME):
+        out.write(f"=== CPU: top {TOP_STATS} by {sort_key.value} ===\n")
+        stats = pstats.Stats(profiler, stream=out)
+        stats.strip_dirs().sort_stats(sort_key).print_stats(TOP_STATS)
+
+    out.write(f"=== Memory: top {TOP_ALLOCATORS} allocators overall ===\n")
+    for diff in sorted(overall, key=lambda d: d.size_diff, reverse=True)[
+        :TOP_ALLOCATORS
+    ]:
+        out.write(f"  {diff}\n")
+
+    out.write(
+        f"\n=== Memory: net per stage (inclusive), top {TOP_ALLOCATORS} allocators "
+        "of memory still held at the end ===\n"
+    )
+    out.write(allocations.format())
+    return out.getvalue()
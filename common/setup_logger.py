@@ -1,6 +1,6 @@
-import logging, os, sys
+import atexit, logging, os, queue, random, sys
 
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from rich.logging import RichHandler
 from pathlib import Path
 
@@ -9,6 +9,35 @@ CONSOLE_FORMATTER = logging.Formatter("%(message)s")
 FILE_FORMATTER = logging.Formatter(
     "%(asctime)s | %(levelname)-8s | %(name)-28s | %(message)s"
 )
+# Loggers whose debug lines are emitted once per word, keep per-word modules below it
+PER_WORD_LOGGER = "pf.audio"
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Enqueue records untouched, leaving `%`-formatting to the listener thread.
+
+    The stock `QueueHandler.prepare` formats the message on the calling thread,
+    which is exactly the work the queue is supposed to move off the hot path.
+    Records never leave the process, so args don't need to be made picklable.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class SampleDebugFilter(logging.Filter):
+    """Let through only a fraction of per-word debug records; other records always pass"""
+
+    def __init__(self, rate: float, prefix: str = PER_WORD_LOGGER):
+        super().__init__()
+        self.rate = rate
+        self.prefix = prefix
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or not record.name.startswith(self.prefix):
+            return True
+        return random.random() < self.rate
 
 
 def setup_logger(
@@ -18,8 +47,16 @@ def setup_logger(
     max_bytes: int = 5 * 1024 * 1024,
     backup_count: int = 3,
     is_main: bool = False,
+    use_queue: bool = False,
+    debug_sample_rate: float = 1.0,
 ):
-    """Setup logger with rich console and file handlers"""
+    """
+    Setup logger with rich console and file handlers.
+
+    With `use_queue`, the handlers are driven by a background `QueueListener`:
+    worker threads only enqueue records, the listener does formatting and I/O.
+    `debug_sample_rate` below 1.0 keeps only that fraction of per-word debug lines.
+    """
     log_file_name = Path(log_file_name)
     log_ext = log_file_name.suffix
     if log_ext != ".log":
@@ -31,12 +68,13 @@ def setup_logger(
     logger.setLevel(logging.DEBUG)
 
     if not logger.handlers:
+        handlers = []
         console_handler = RichHandler(
             show_time=False, show_level=False, show_path=False, rich_tracebacks=True
         )
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(CONSOLE_FORMATTER)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
         log_file_dir.mkdir(parents=True, exist_ok=True)
         log_file_path = log_file_dir / log_file_name
@@ -46,7 +84,20 @@ def setup_logger(
         )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(FILE_FORMATTER)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+        if use_queue:
+            log_queue = queue.SimpleQueue()
+            queue_handler = DeferredQueueHandler(log_queue)
+            listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            listener.start()
+            atexit.register(listener.stop)
+            handlers = [queue_handler]
+
+        for handler in handlers:
+            if debug_sample_rate < 1.0:
+                handler.addFilter(SampleDebugFilter(debug_sample_rate))
+            logger.addHandler(handler)
 
     if is_main:
         # Add startup marker
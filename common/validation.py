@@ -1,37 +1,107 @@
+import os
 import re
+import time
 import shutil
 import string
 import logging
+import threading
 
 from rich.console import Console
 from rich.prompt import Confirm
 from pathlib import Path
 
 from common.console_utils import show_separator
+from common.constants import OUTPUT_INDEX_NAME
 
 
 log = logging.getLogger("pf.validation")
 console = Console()
 
 
-def validate_path(path: Path) -> None:
+def is_empty_dir(path: Path) -> bool:
+    """Check for any entry without listing the whole directory"""
+    with os.scandir(path) as entries:
+        return next(entries, None) is None
+
+
+def count_indexed_files(path: Path) -> int | None:
+    """Number of files recorded in a sharded folder's index, `None` if there is no index"""
+    index_path = path / OUTPUT_INDEX_NAME
+    if not index_path.exists():
+        return None
+    with open(index_path, encoding="utf-8") as f:
+        return len({line.partition("\t")[0] for line in f})
+
+
+def _trash_name(path: Path) -> str:
+    return f".{path.name}.trash-"
+
+
+def sweep_trash(path: Path) -> None:
+    """Remove trees `clear_dir` moved aside but didn't get to delete (the process died)"""
+    for trash in path.parent.glob(f"{_trash_name(path)}*"):
+        log.debug(f"Removing leftover folder: {trash}")
+        threading.Thread(
+            target=shutil.rmtree,
+            args=(trash,),
+            kwargs={"ignore_errors": True},
+            name="pf-clear-downloads",
+        ).start()
+
+
+def clear_dir(path: Path) -> None:
+    """
+    Empty a folder without making the user wait for the delete.
+
+    The folder is renamed aside (a single metadata operation, however many files
+    it holds), recreated empty, and the old tree is removed on a background thread.
+    """
+    trash = path.with_name(f"{_trash_name(path)}{time.time_ns()}")
+    try:
+        path.rename(trash)
+    except OSError:
+        log.debug("Could not move the folder aside, deleting in place")
+        shutil.rmtree(path)
+        path.mkdir(parents=True)
+        return
+    path.mkdir(parents=True)
+    threading.Thread(
+        target=shutil.rmtree,
+        args=(trash,),
+        kwargs={"ignore_errors": True},
+        name="pf-clear-downloads",
+    ).start()
+
+
+def validate_path(path: Path, check_contents: bool = True) -> None:
+    """
+    Make sure the download folder exists and offer to clear leftover files.
+
+    Args:
+        path: Download folder.
+        check_contents: Skip the leftover-files check, e.g. when output goes
+            into a fresh archive and existing files don't get in the way.
+    """
     log.info(f"Validating download folder: \"{path}\"")
+    if path.parent.is_dir():
+        sweep_trash(path)
     if not path.exists():
         path.mkdir(parents=True, exist_ok=True)
         log.info(f"Download folder doesn't exist. Creating it...")
     elif not path.is_dir():
         # logging for this case handled in the main script
         raise NotADirectoryError(f'Provided path is not a directory')
-    elif any(path.iterdir()):
+    elif check_contents and not is_empty_dir(path):
         # log.debug(f"Downloads folder is not empty: {full_path}")
         log.debug(f"Download folder is not empty")
+        indexed = count_indexed_files(path)
+        found = f"{indexed} indexed files" if indexed else "files"
         confirm = Confirm.ask(
-            f"Found files in the download folder. Clear them?", default=False
+            f"Found {found} in the download folder. Clear them?", default=False
         )
         if confirm:
             log.debug("User decided to clear the downloads folder")
-            shutil.rmtree(path)
-            path.mkdir(parents=True)
+            clear_dir(path)
         else:
             log.debug("User decided to keep existing files")
     log.info(f"Downloads directory ready!")
@@ -1,13 +1,28 @@
 import os
+import logging
+import argparse
 
 from typing import Any
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.prompt import Prompt, Confirm
 from pathlib import Path
-from platformdirs import user_log_path, user_downloads_path
+from platformdirs import user_log_path, user_downloads_path, user_data_path
 
 from sources.audio_pipeline import AudioPipeline
+from sources.audio_sinks import OUTPUT_FORMATS, OUTPUT_LAYOUTS, create_sink
+from sources.distributed import BATCH_SIZE, run_workers
+from sources.service import PronunciationService, serve
+from sources.work_queue import LEASE_SECONDS, WorkQueue
+from sources.url_index import UrlIndex, build_index, index_path
+from sources.manifest import (
+    BULK_CONNECTIONS,
+    PARTS_DIR_NAME,
+    ManifestEntry,
+    ManifestWriter,
+    download_manifest,
+    read_manifest,
+)
 from sources.free_dictionary_api import FreeDictAPIFetcher
 from sources.merriam_webster_api import MerriamWebsterDictAPIFetcher
 from sources.oxford_dictionary_scraper import OxfordDictScraper
@@ -15,6 +30,7 @@ from common.validation import normalize_words, validate_path
 from common.custom_exceptions import UserExitException
 from common.console_utils import show_separator
 from common.setup_logger import setup_logger
+from common.profiling import profile_pipeline
 from common.constants import CURRENT_DIRECTORY
 
 load_dotenv()
@@ -23,26 +39,24 @@ console = Console()
 appname = "Pronunciation Fetcher"
 appauthor = "todmount"
 log_path = user_log_path(appname, appauthor)
-log = setup_logger(
-    name="pf",
-    log_file_dir=log_path,
-    log_file_name="main.log",
-    is_main=True,
-)
+default_index_dir = user_data_path(appname, appauthor) / "indexes"
+# Handlers are attached by `setup_logger` once the command line is parsed
+log = logging.getLogger("pf")
 
 providers_dict = {
     "Merriam-Webster API": {
         "specs": {
             "class": MerriamWebsterDictAPIFetcher,
+            "key": "mw",
             "env": "MW_API_KEY",
             "url": "https://dictionaryapi.com/",
         },
     },
     "Free Dictionary API": {
-        "specs": {"class": FreeDictAPIFetcher},
+        "specs": {"class": FreeDictAPIFetcher, "key": "free-dict"},
     },
     "Oxford Learner's Dictionary (Scraper)": {
-        "specs": {"class": OxfordDictScraper},
+        "specs": {"class": OxfordDictScraper, "key": "oxford"},
     },
 }
 
@@ -89,6 +103,30 @@ def get_user_api(provider) -> str | None:
     return os.getenv(env_var) if env_var else None
 
 
+def provider_by_key(key: str) -> tuple[str, type[AudioPipeline], str | None]:
+    """Look up a provider by its command line key. Returns its name, class and API key"""
+    for provider, entry in providers_dict.items():
+        specs = entry["specs"]
+        if specs["key"] == key:
+            return provider, specs["class"], get_user_api(provider)
+    raise ValueError(f"Unknown provider: {key}")
+
+
+def open_url_index(options: argparse.Namespace, key: str) -> UrlIndex | None:
+    """Prebuilt URL index for a provider, if one was built in the index folder"""
+    url_index = UrlIndex.for_provider(options.url_index, key)
+    if url_index is not None:
+        log.info(f"Using URL index with {len(url_index)} words for {key}")
+    return url_index
+
+
+def require_api(provider: str, user_api: str | None) -> None:
+    """Non-interactive commands can't prompt for a key, it has to be in the environment"""
+    if api_key_requirement(provider) and user_api is None:
+        env_var = providers_dict[provider]["specs"]["env"]
+        raise UserExitException(f"{provider} needs an API key, set {env_var} in .env")
+
+
 def choose_provider() -> tuple[str, type[AudioPipeline], str]:
     console.print("Choose a provider:")
     providers_enumerated: dict = {
@@ -291,7 +329,7 @@ def get_download_path() -> Path | None:
     return None
 
 
-def setup_download_path() -> Path:
+def setup_download_path(options: argparse.Namespace) -> Path:
     default_path = user_downloads_path() / appname
     log.info(f"Current download path is \"{default_path}\"")
     cust_folder = get_download_path()
@@ -299,31 +337,45 @@ def setup_download_path() -> Path:
         download_path = cust_folder
     else:
         download_path = default_path
-    validate_path(download_path)
+    validate_path(download_path, check_contents=options.output_format == "files")
     return download_path
 
 
-def main(failed_list: list[str], download_path: str | Path) -> tuple[str, list[str]]:
+def main(
+    failed_list: list[str], download_path: str | Path, options: argparse.Namespace
+) -> tuple[str, list[str]]:
     provider, provider_class, env_var, user_api = get_setup_info()
     words_to_process = get_words(failed_list)
-    fetcher = provider_class(output_dir=download_path)
-    fetcher.run(words=words_to_process, api=user_api)
+    fetcher = provider_class(
+        output_dir=download_path,
+        validate_audio=not options.no_validate,
+        sink=create_sink(
+            options.output_format, download_path, provider, options.layout
+        ),
+        url_index=open_url_index(options, providers_dict[provider]["specs"]["key"]),
+        spill_threshold=options.spill_after,
+    )
+    if options.profile:
+        log.debug("Profiling enabled for this run")
+        with profile_pipeline(fetcher, log_path):
+            failed_list = fetcher.run(words_to_process, user_api, options.workers)
+    else:
+        failed_list = fetcher.run(words_to_process, user_api, options.workers)
 
-    if fetcher.failed:
-        failed_list: list[str] = fetcher.failed
+    if failed_list:
         restart = handle_failed(failed_list, provider)
         if restart:
             return download_path, failed_list
     return download_path, []
 
 
-def run() -> None:
+def run(options: argparse.Namespace) -> None:
     failed_words = []
-    download_folder = setup_download_path()
+    download_folder = setup_download_path(options)
 
     while True:
         show_separator()
-        download_folder, failed_words = main(failed_words, download_folder)
+        download_folder, failed_words = main(failed_words, download_folder, options)
 
         if not failed_words:
             console.print("Program finished")
@@ -334,10 +386,352 @@ def run() -> None:
         break
 
 
+def command_enqueue(options: argparse.Namespace) -> None:
+    provider, _, _ = provider_by_key(options.provider)
+    words, _ = normalize_words(open_txt(options.words_file))
+    queue = WorkQueue(options.queue, shared=options.shared_storage)
+    added = queue.enqueue(options.provider, words)
+    log.info(f"Queued {added} new words for {provider} in \"{options.queue}\"")
+
+
+def command_work(options: argparse.Namespace) -> None:
+    provider, provider_class, user_api = provider_by_key(options.provider)
+    require_api(provider, user_api)
+    options.output.mkdir(parents=True, exist_ok=True)
+    log.info(f"Starting {options.processes} workers for {provider}")
+    counts = run_workers(
+        options.processes,
+        options.queue,
+        options.provider,
+        console,
+        provider_class=provider_class,
+        output_dir=options.output,
+        api=user_api,
+        threads=options.workers,
+        batch_size=options.batch_size,
+        lease_seconds=options.lease_seconds,
+        output_format=options.output_format,
+        layout=options.layout,
+        validate_audio=not options.no_validate,
+        follow=options.follow,
+        log_dir=log_path,
+        url_index_dir=options.url_index,
+        queue_logging=options.queue_logging,
+        log_sample=options.log_sample,
+    )
+    log.info(
+        f"Queue for {provider}: {counts['done']} done, {counts['failed']} failed, "
+        f"{counts['pending'] + counts['leased']} remaining"
+    )
+
+
+def command_queue_status(options: argparse.Namespace) -> None:
+    if not options.queue.is_file():
+        raise UserExitException(f'No queue found at "{options.queue}"')
+    queue = WorkQueue(options.queue)
+    for key in queue.providers():
+        counts = queue.counts(key)
+        console.print(
+            f"{key}: {counts['done']} done, {counts['failed']} failed, "
+            f"{counts['leased']} leased, {counts['pending']} pending"
+        )
+
+
+def command_serve(options: argparse.Namespace) -> None:
+    pipelines = {}
+    for provider, entry in providers_dict.items():
+        specs = entry["specs"]
+        user_api = get_user_api(provider)
+        if api_key_requirement(provider) and user_api is None:
+            log.info(f"Skipping {provider}: no API key in {specs['env']}")
+            continue
+        # The service never saves files, audio is returned in responses
+        pipeline = specs["class"](
+            output_dir=None,
+            validate_audio=not options.no_validate,
+            url_index=open_url_index(options, specs["key"]),
+        )
+        pipelines[specs["key"]] = (pipeline, user_api)
+    serve(PronunciationService(pipelines), options.host, options.port)
+
+
+def command_build_index(options: argparse.Namespace) -> None:
+    provider, provider_class, user_api = provider_by_key(options.provider)
+    require_api(provider, user_api)
+    words, _ = normalize_words(open_txt(options.words_file))
+    # Resolve through the network only, never through the index being built
+    pipeline = provider_class(output_dir=None)
+    resolved, total = build_index(
+        pipeline,
+        words,
+        user_api,
+        index_path(options.url_index, options.provider),
+        workers=options.workers,
+        refresh=options.refresh,
+    )
+    log.info(f"Resolved {resolved} new words, {total} words indexed for {provider}")
+
+
+def command_resolve(options: argparse.Namespace) -> None:
+    provider, provider_class, user_api = provider_by_key(options.provider)
+    require_api(provider, user_api)
+    words, _ = normalize_words(open_txt(options.words_file))
+    listed = set()
+    if options.manifest.exists():
+        listed = {
+            entry.word
+            for entry in read_manifest(options.manifest)
+            if entry.provider == options.provider
+        }
+    with ManifestWriter(options.manifest, options.provider) as manifest:
+        pipeline = provider_class(
+            output_dir=None,
+            manifest=manifest,
+            url_index=open_url_index(options, options.provider),
+            spill_threshold=options.spill_after,
+        )
+        pipeline.process_words(
+            [word for word in words if word not in listed], user_api, options.workers
+        )
+    log.info(
+        f"Resolved {pipeline.results.done_count} URLs for {provider} into "
+        f"\"{options.manifest}\", {pipeline.results.failed_count} failed, "
+        f"{len(listed)} already listed"
+    )
+    pipeline.results.close()
+
+
+def command_bulk_download(options: argparse.Namespace) -> None:
+    entries_by_provider: dict[str, list[ManifestEntry]] = {}
+    for entry in read_manifest(options.manifest):
+        entries_by_provider.setdefault(entry.provider, []).append(entry)
+    options.output.mkdir(parents=True, exist_ok=True)
+
+    for key, entries in entries_by_provider.items():
+        try:
+            provider, provider_class, _ = provider_by_key(key)
+        except ValueError as e:
+            log.error(f"Skipping {len(entries)} manifest entries: {e}")
+            continue
+        sink = create_sink(
+            options.output_format, options.output, provider, options.layout
+        )
+        pipeline = provider_class(
+            options.output,
+            sink=sink,
+            validate_audio=not options.no_validate,
+            spill_threshold=options.spill_after,
+        )
+        try:
+            download_manifest(
+                pipeline, entries, options.output / PARTS_DIR_NAME, options.connections
+            )
+        finally:
+            sink.close()
+            pipeline.results.close()
+        log.info(
+            f"Downloaded {pipeline.results.done_count} words for {provider}, "
+            f"{pipeline.results.failed_count} failed"
+        )
+
+
+commands = {
+    "build-index": command_build_index,
+    "resolve": command_resolve,
+    "bulk-download": command_bulk_download,
+    "enqueue": command_enqueue,
+    "work": command_work,
+    "queue-status": command_queue_status,
+    "serve": command_serve,
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=appname)
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"profile CPU and memory of each run, reports are saved to \"{log_path}\"",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="number of words processed concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="files",
+        help="save loose .mp3 files, stream into a zip, or into a zip laid out as "
+        "Anki media (default: files)",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=OUTPUT_LAYOUTS,
+        default="flat",
+        help="spread loose files over subfolders by first letters or by hash, "
+        "with an index for lookups (default: flat)",
+    )
+    parser.add_argument(
+        "--no-validate",
+        action="store_true",
+        help="save downloaded audio without checking it is a playable MP3",
+    )
+    parser.add_argument(
+        "--url-index",
+        type=Path,
+        default=default_index_dir,
+        metavar="DIR",
+        help="folder with prebuilt URL indexes, used when one exists for the "
+        "provider (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--spill-after",
+        type=int,
+        default=None,
+        metavar="N",
+        help="keep at most N word results in memory and the rest in a temporary "
+        "file, for very long word lists (default: all in memory)",
+    )
+    parser.add_argument(
+        "--queue-logging",
+        action="store_true",
+        help="format and write logs on a background thread",
+    )
+    parser.add_argument(
+        "--log-sample",
+        type=float,
+        default=1.0,
+        metavar="RATE",
+        help="fraction of per-word debug lines to keep, between 0 and 1 (default: 1)",
+    )
+
+    provider_keys = [entry["specs"]["key"] for entry in providers_dict.values()]
+    subparsers = parser.add_subparsers(
+        dest="command", title="commands", help="run without a command for prompts"
+    )
+
+    index = subparsers.add_parser(
+        "build-index", help="resolve a word list once into a local URL index"
+    )
+    index.add_argument("words_file", type=Path, help=".txt file with words")
+    index.add_argument("--provider", choices=provider_keys, required=True)
+    index.add_argument(
+        "--refresh",
+        action="store_true",
+        help="resolve every word again instead of only the missing ones",
+    )
+
+    enqueue = subparsers.add_parser("enqueue", help="add words to a shared work queue")
+    enqueue.add_argument("queue", type=Path, help="queue database file")
+    enqueue.add_argument("words_file", type=Path, help=".txt file with words")
+    enqueue.add_argument("--provider", choices=provider_keys, required=True)
+    enqueue.add_argument(
+        "--shared-storage",
+        action="store_true",
+        help="make the queue usable by workers on other machines through a "
+        "network share (rollback journal instead of WAL)",
+    )
+
+    work = subparsers.add_parser(
+        "work", help="process queued words with several worker processes"
+    )
+    work.add_argument("queue", type=Path, help="queue database file")
+    work.add_argument("--provider", choices=provider_keys, required=True)
+    work.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        metavar="N",
+        help="worker processes to start (default: CPU count)",
+    )
+    work.add_argument(
+        "--output",
+        type=Path,
+        default=user_downloads_path() / appname,
+        help="download folder (default: %(default)s)",
+    )
+    work.add_argument("--batch-size", type=int, default=BATCH_SIZE, metavar="N")
+    work.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=LEASE_SECONDS,
+        metavar="S",
+        help="time before words of an unresponsive worker are handed out again",
+    )
+    work.add_argument(
+        "--follow",
+        action="store_true",
+        help="keep waiting for new words once the queue is drained",
+    )
+
+    resolve = subparsers.add_parser(
+        "resolve", help="look up audio URLs into a manifest without downloading"
+    )
+    resolve.add_argument("words_file", type=Path, help=".txt file with words")
+    resolve.add_argument("--provider", choices=provider_keys, required=True)
+    resolve.add_argument(
+        "--manifest",
+        type=Path,
+        default=Path("manifest.tsv"),
+        help="manifest to add the URLs to (default: %(default)s)",
+    )
+
+    bulk = subparsers.add_parser(
+        "bulk-download", help="download the audio listed in a manifest"
+    )
+    bulk.add_argument("manifest", type=Path, help="manifest written by 'resolve'")
+    bulk.add_argument(
+        "--output",
+        type=Path,
+        default=user_downloads_path() / appname,
+        help="download folder (default: %(default)s)",
+    )
+    bulk.add_argument(
+        "--connections",
+        type=int,
+        default=BULK_CONNECTIONS,
+        metavar="N",
+        help="concurrent downloads (default: %(default)s)",
+    )
+
+    status = subparsers.add_parser("queue-status", help="show queue progress")
+    status.add_argument("queue", type=Path, help="queue database file")
+
+    service = subparsers.add_parser(
+        "serve", help="run a local HTTP service for on-demand lookups"
+    )
+    service.add_argument("--host", default="127.0.0.1")
+    service.add_argument("--port", type=int, default=8765)
+
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    setup_logger(
+        name="pf",
+        log_file_dir=log_path,
+        log_file_name="main.log",
+        is_main=True,
+        use_queue=args.queue_logging,
+        debug_sample_rate=args.log_sample,
+    )
+    if args.command:
+        try:
+            commands[args.command](args)
+        except KeyboardInterrupt:
+            log.info("Exiting...")
+        except UserExitException as e:
+            log.error(f"{e}")
+            exit(1)
+        exit(0)
+
     while True:
         try:
-            run()
+            run(args)
         except (KeyboardInterrupt, UserExitException):
             log.info("Exiting...")
             exit(0)
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+import time
+
+from typing import Any, Iterable
+
+from sources.audio_pipeline import (
+    AudioNotFound,
+    AudioPipeline,
+    DownloadError,
+    InvalidAudio,
+    MAX_RETRIES,
+    WordNotFound,
+)
+from sources.mp3_validation import inspect_mp3
+from sources.results import ResultStore
+
+try:
+    import aiohttp
+except ImportError:  # optional, only needed for the asyncio API
+    aiohttp = None
+
+
+log = logging.getLogger("pf.audio.async")
+
+MAX_CONCURRENCY = 1000
+CONNECTION_LIMIT = 100
+REQUEST_TIMEOUT = 10
+
+
+class AsyncResponse:
+    """
+    Minimal stand-in for `requests.Response`, so each provider's
+    `parse_word_response` works unchanged on aiohttp responses.
+    """
+
+    __slots__ = ("status_code", "content", "encoding", "url")
+
+    def __init__(self, status_code: int, content: bytes, encoding: str, url: str):
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class AsyncAudioPipeline:
+    """
+    asyncio counterpart of `AudioPipeline`, for embedding in async services.
+
+    Wraps a provider's pipeline and reuses its `get_word_url`,
+    `parse_word_response`, `extract_candidate` and `normalize_audio_url`
+    as they are; only the HTTP calls are async (aiohttp). Results go to the
+    wrapped pipeline's `results` and audio to its `sink`.
+
+    `run` keeps at most `max_concurrency` words in flight using that many
+    worker coroutines, so memory doesn't grow with the length of the word list.
+    Parsing runs in a thread when `parse_in_thread` is set (HTML parsing would
+    otherwise stall the event loop), MP3 validation in the pipeline's validator
+    pool if it has one.
+
+    Use as an async context manager, or call `close()` when done:
+
+        async with AsyncAudioPipeline(FreeDictAPIFetcher(output_dir)) as fetcher:
+            url = await fetcher.get_audio_url("dog", None)
+    """
+
+    def __init__(
+        self,
+        pipeline: AudioPipeline,
+        max_concurrency: int = MAX_CONCURRENCY,
+        connection_limit: int = CONNECTION_LIMIT,
+        parse_in_thread: bool = True,
+    ):
+        if aiohttp is None:
+            raise ImportError(
+                "The asyncio API needs aiohttp, install it with 'pip install aiohttp'"
+            )
+        self.pipeline = pipeline
+        self.max_concurrency = max_concurrency
+        self.connection_limit = connection_limit
+        self.parse_in_thread = parse_in_thread
+        self._session: aiohttp.ClientSession | None = None
+        # Requests wait here for a free connection, so the timeout below only
+        # counts time on the wire, not time queued behind other words
+        self._connections = asyncio.Semaphore(connection_limit)
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connection_limit),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                headers=self.pipeline.headers,
+            )
+        return self._session
+
+    async def __aenter__(self) -> "AsyncAudioPipeline":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get(self, url: str) -> AsyncResponse:
+        async with self._connections, self.session.get(url) as response:
+            content = await response.read()
+            return AsyncResponse(
+                response.status,
+                content,
+                response.get_encoding() if content else "utf-8",
+                str(response.url),
+            )
+
+    async def fetch_word_data(self, word: str, api_key: str | None) -> Any:
+        """Async `AudioPipeline.fetch_word_data`, same steps and exceptions"""
+        url = self.pipeline.get_word_url(word, api_key)
+        word = word.lower()
+        try:
+            word_response = await self._get(url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.error("Error fetching word data: %s", e)
+            raise DownloadError(f"Error fetching word data: {e}") from e
+        if word_response.status_code == 404:
+            raise WordNotFound(f"Word not found: {word}")
+        elif word_response.status_code != 200:
+            raise DownloadError(
+                f"Failed to fetch page. Status code: {word_response.status_code}"
+            )
+        if self.parse_in_thread:
+            return await asyncio.to_thread(
+                self.pipeline.parse_word_response, word_response
+            )
+        return self.pipeline.parse_word_response(word_response)
+
+    async def get_audio_url(self, word: str, api_key: str | None) -> str:
+        """Async `AudioPipeline.get_audio_url`: index, or fetch, extract, normalize"""
+        indexed = self.pipeline.indexed_audio_url(word)
+        if indexed:
+            return indexed
+
+        log.debug("Fetching audio URL for: %s", word)
+        data = await self.fetch_word_data(word, api_key)
+
+        candidates = self.pipeline.extract_candidate(data)
+        if not candidates:
+            raise AudioNotFound
+
+        url = self.pipeline.normalize_audio_url(candidates)
+        log.debug("Audio found: %s", url)
+        return url
+
+    async def fetch_audio(self, audio_url: str) -> bytes:
+        """Async `AudioPipeline.fetch_audio`, raises DownloadError on failure"""
+        try:
+            audio_response = await self._get(audio_url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.error("Error downloading audio: %s", e)
+            raise DownloadError(f"Error downloading audio: {e}") from e
+
+        if audio_response.status_code != 200:
+            raise DownloadError(
+                f"Failed to download audio. Status code: {audio_response.status_code}"
+            )
+        if self.pipeline.validate_audio:
+            loop = asyncio.get_running_loop()
+            info = await loop.run_in_executor(
+                self.pipeline.validator, inspect_mp3, audio_response.content
+            )
+            if not info.valid:
+                raise InvalidAudio(info.problem)
+        return audio_response.content
+
+    async def download_audio(self, word: str, api_key: str | None) -> None:
+        """Async `AudioPipeline.download_audio` (same retries), the sink write runs in a thread"""
+        audio_url = await self.get_audio_url(word, api_key)
+        if not audio_url:
+            raise DownloadError(f"Audio not found for: {word}")
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                content = await self.fetch_audio(audio_url)
+                break
+            except InvalidAudio as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                log.debug("Retrying %s after invalid audio: %s", word, e)
+        location = await asyncio.to_thread(self.pipeline.sink.write, word, content)
+        log.debug("Saved to: %s", location)
+
+    async def process_word(
+        self, word: str, api: str | None
+    ) -> tuple[float, Exception | None]:
+        started = time.perf_counter()
+        try:
+            await self.download_audio(word, api)
+        except Exception as e:
+            return time.perf_counter() - started, e
+        return time.perf_counter() - started, None
+
+    async def process_words(self, words: Iterable[str], api: str | None = None) -> None:
+        """Process words with `max_concurrency` worker coroutines"""
+        results = self.pipeline.results
+        # Only words in flight, recorded ones are found in `results`
+        queued: set[str] = set()
+        source = iter(words)
+
+        async def worker() -> None:
+            # Iterators are shared safely: coroutines only switch at awaits
+            for word in source:
+                if word in results or word in queued:
+                    continue
+                queued.add(word)
+                latency, error = await self.process_word(word, api)
+                self.pipeline.record_outcome(word, latency, error)
+                queued.discard(word)
+
+        await asyncio.gather(*(worker() for _ in range(self.max_concurrency)))
+
+    async def run(self, words: Iterable[str], api: str | None = None) -> ResultStore:
+        """
+        Async `AudioPipeline.run` without the interactive parts.
+
+        Returns:
+            The pipeline's ResultStore with every word's outcome. Close it when
+            done with it, it may hold a spill file.
+        """
+        log.info(f"Starting async download with {self.pipeline.name}")
+        try:
+            await self.process_words(words, api)
+        finally:
+            await asyncio.to_thread(self.pipeline.sink.close)
+        return self.pipeline.results
@@ -1,17 +1,42 @@
 import logging
+import os
+import time
 import requests
 
 from abc import ABC, abstractmethod
+from requests.adapters import HTTPAdapter
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import AbstractContextManager, nullcontext
 from rich.console import Console
-from rich.progress import Progress
 from rich.prompt import Confirm
 from rich.table import Table
-from typing import Any
+from typing import Any, Callable, Iterable
 from pathlib import Path
 
+from sources.audio_sinks import AudioSink, DirectorySink
+from sources.dashboard import PipelineDashboard
+from sources.manifest import ManifestWriter
+from sources.mp3_validation import Mp3Info, inspect_mp3, validator_pool
+from sources.results import ResultStore
+from sources.url_index import UrlIndex
 
 log = logging.getLogger("pf.audio")
 
+IN_FLIGHT_PER_WORKER = 4
+# (word, latency, error) of a processed word
+Outcome = tuple[str, float, Exception | None]
+MAX_RETRIES = 1
+# Keep-alive connections per host, enough for a busy worker pool or service
+HTTP_POOL_SIZE = 32
+DOWNLOAD_CHUNK = 64 * 1024
+
 
 class WordNotFound(Exception):
     pass
@@ -25,6 +50,12 @@ class DownloadError(Exception):
     pass
 
 
+class InvalidAudio(DownloadError):
+    """Downloaded payload is not usable audio. Retryable, the next attempt may succeed"""
+
+    pass
+
+
 class AudioPipeline(ABC):
 
     def __init__(
@@ -32,20 +63,49 @@ class AudioPipeline(ABC):
         output_dir: Path,
         name: str = "",
         process_name: str = "Fetching",
+        spill_threshold: int | None = None,
+        validate_audio: bool = True,
+        sink: AudioSink | None = None,
+        url_index: UrlIndex | None = None,
+        manifest: ManifestWriter | None = None,
     ):
         self.headers = None
         self.output_dir = output_dir
-        self.failed: list = []
-        self.reasons: list = []
-        self.done: list = []
+        self.sink: AudioSink = sink if sink is not None else DirectorySink(output_dir)
+        self.results = ResultStore(provider=name, spill_threshold=spill_threshold)
         self.console = Console()
         self.name: str = name
         self.process_name: str = process_name
-
-    def add_to_failed(self, word: str, reason: str) -> None:
-        if word not in self.failed:
-            self.failed.append(word)
-        self.reasons.append(reason)
+        self.dashboard: PipelineDashboard | None = None
+        self.validate_audio = validate_audio
+        self.validator: ProcessPoolExecutor | None = None
+        # Run tasks one by one on the calling thread (set while profiling, as
+        # profilers and per-stage memory tracking only follow that thread)
+        self.inline_tasks = False
+        # Prebuilt word -> URL index, consulted before any network lookup
+        self.url_index = url_index
+        # Resolve-only runs record URLs here instead of downloading them
+        self.manifest = manifest
+        # One connection pool per pipeline, shared by all of its threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def done(self) -> list[str]:
+        return self.results.done_words()
+
+    @property
+    def failed(self) -> list[str]:
+        return self.results.failed_words()
+
+    @property
+    def reasons(self) -> list[str]:
+        return [record.reason for record in self.results.failed_records()]
+
+    def add_to_failed(self, word: str, reason: str, latency: float = 0.0) -> None:
+        self.results.add_failed(word, reason, latency)
 
     @abstractmethod
     def get_word_url(self, word: str, api_key: str | None) -> str:
@@ -76,7 +136,7 @@ class AudioPipeline(ABC):
         """
         url = self.get_word_url(word, api_key)
         word = word.lower()
-        word_response = requests.get(url, timeout=10, headers=self.headers)
+        word_response = self.session.get(url, timeout=10, headers=self.headers)
         if word_response.status_code == 404:
             raise WordNotFound(f"Word not found: {word}")
         elif word_response.status_code != 200:
@@ -99,48 +159,156 @@ class AudioPipeline(ABC):
         """
         pass
 
-    def process_words(self, words: list, api: str = None) -> None:
-        progress = Progress(
-            "[progress.description]{task.description}",
-            "[progress.percentage]{task.percentage:>3.0f}%",
-            console=self.console,
-        )
-        progress.start()
-        task = progress.add_task(
-            f"Processing words...", total=len(words), style="bold cyan"
-        )
+    def stage(self, name: str) -> AbstractContextManager:
+        """Report a word as being in pipeline stage `name` on the live dashboard, if any"""
+        if self.dashboard is None:
+            return nullcontext()
+        return self.dashboard.track(self.name, name)
+
+    def process_word(
+        self, word: str, api: str | None
+    ) -> tuple[float, Exception | None]:
+        """Run a single word through the pipeline. Returns its latency and the error raised, if any"""
+        started = time.perf_counter()
+        try:
+            if self.manifest is None:
+                self.download_audio(word=word, api_key=api)
+            else:
+                self.resolve_audio(word=word, api_key=api)
+        except Exception as e:
+            return time.perf_counter() - started, e
+        return time.perf_counter() - started, None
+
+    def record_outcome(
+        self, word: str, latency: float, error: Exception | None
+    ) -> str | None:
+        """Store the outcome of `process_word`. Returns the failure reason, if any"""
+        if error is None:
+            self.results.add_done(word, latency)
+            return None
+
+        if isinstance(error, WordNotFound):
+            log.debug("Word not found: %s", word)
+            reason = "Word not found"
+        elif isinstance(error, AudioNotFound):
+            log.debug("Audio not found: %s", word)
+            reason = "Audio not found"
+        elif isinstance(error, InvalidAudio):
+            log.debug("Invalid audio for %s: %s", word, error)
+            reason = f"Invalid audio: {error}"
+        elif isinstance(error, DownloadError):
+            log.debug("Download failed for %s: %s", word, error)
+            reason = "Download error"
+        elif isinstance(error, NotImplementedError):
+            log.debug("API response triggered unimplemented feature")
+            reason = (
+                "[MW exclusive] Triggered unimplemented 'did you mean x?'. "
+                "Try another source"
+            )
+        else:
+            log.debug("[!] Unexpected error for %s : %s", word, error)
+            reason = "Unexpected error. Try another source"
+        self.add_to_failed(word, reason, latency)
+        return reason
 
-        for entry in words:
-            progress.update(task, advance=1, refresh=True)
-            if entry in self.done or entry in self.failed:
-                continue
+    def run_tasks(
+        self,
+        items: Iterable,
+        task: Callable[[Any], list[Outcome]],
+        workers: int,
+        total: int,
+        description: str = "Processing words...",
+        skip: Callable[[Any], bool] | None = None,
+        recorded: Callable[[str], None] | None = None,
+    ) -> None:
+        """
+        Run `task(item)` for every item on a pool of `workers` threads.
+
+        At most `workers * IN_FLIGHT_PER_WORKER` items are submitted at a time, so
+        memory stays flat for long inputs. Each task returns (word, latency, error)
+        outcomes, which are recorded on the calling thread; the dashboard redraws
+        on its own schedule. Items for which `skip` returns true are counted as
+        skipped without running, `recorded` is called with every word once its
+        outcome is stored. With `inline_tasks` set, tasks (and audio
+        validation) run one at a time on the calling thread instead.
+        """
+        max_in_flight = workers * IN_FLIGHT_PER_WORKER
+        pending: set[Future] = set()
+
+        with (
+            PipelineDashboard(
+                total=total, console=self.console, description=description
+            ) as dashboard,
+            ThreadPoolExecutor(max_workers=workers) as pool,
+        ):
+            self.dashboard = dashboard
+            # A validator set up by the caller is reused and left running
+            owns_validator = (
+                self.validate_audio and self.validator is None and not self.inline_tasks
+            )
+            if owns_validator:
+                # MP3 parsing is CPU-bound, keep it off the I/O threads' GIL
+                self.validator = validator_pool(
+                    max(1, min(workers, os.cpu_count() or 1))
+                )
+
+            def record(outcomes: list[Outcome]) -> None:
+                for word, latency, error in outcomes:
+                    dashboard.advance(self.record_outcome(word, latency, error))
+                    if recorded is not None:
+                        recorded(word)
+
+            def collect(return_when: str) -> None:
+                finished, _ = wait(pending, return_when=return_when)
+                for future in finished:
+                    pending.remove(future)
+                    record(future.result())
 
             try:
-                # print(f"Fetching pronunciation for: {entry}")
-                self.download_audio(word=entry, api_key=api)
-                self.done.append(entry)
-            except WordNotFound:
-                log.debug(f"Word not found: {entry}")
-                self.add_to_failed(entry, reason="Word not found")
-            except AudioNotFound:
-                log.debug(f"Audio not found: {entry}")
-                self.add_to_failed(entry, reason="Audio not found")
-            except DownloadError as e:
-                log.debug(f"Download failed for {entry}: {e}")
-                self.add_to_failed(entry, reason="Download error")
-            except NotImplementedError:
-                log.debug(f"API response triggered unimplemented feature")
-                self.add_to_failed(
-                    entry,
-                    reason="[MW exclusive] Triggered unimplemented 'did you mean x?'. "
-                    "Try another source",
-                )
-            except Exception as e:
-                log.debug(f"[!] Unexpected error for {entry} : {e}")
-                self.add_to_failed(
-                    entry, reason=f"Unexpected error. Try another source"
-                )
-            progress.stop()
+                for item in items:
+                    if skip is not None and skip(item):
+                        dashboard.skip()
+                        continue
+                    if self.inline_tasks:
+                        record(task(item))
+                        continue
+                    pending.add(pool.submit(task, item))
+                    if len(pending) >= max_in_flight:
+                        collect(FIRST_COMPLETED)
+                while pending:
+                    collect(ALL_COMPLETED)
+            finally:
+                # On Ctrl-C, drop queued items instead of working through them
+                pool.shutdown(wait=False, cancel_futures=True)
+                self.dashboard = None
+                if owns_validator:
+                    self.validator.shutdown()
+                    self.validator = None
+
+    def process_words(self, words: list, api: str = None, workers: int = 1) -> None:
+        """
+        Process words on a pool of `workers` threads (see `run_tasks`).
+        """
+        # Only words in flight, recorded ones are found in self.results
+        queued: set[str] = set()
+
+        def seen(word: str) -> bool:
+            if word in self.results or word in queued:
+                return True
+            queued.add(word)
+            return False
+
+        def task(word: str) -> list[Outcome]:
+            return [(word, *self.process_word(word, api))]
+
+        self.run_tasks(
+            words,
+            task,
+            workers,
+            total=len(words),
+            skip=seen,
+            recorded=queued.discard,
+        )
 
     def display_failed_words_table(self):
         try:
@@ -159,8 +327,8 @@ class AudioPipeline(ABC):
             )
             table.add_column("Reason", justify="center", style="green", no_wrap=True)
 
-            for word, reason in zip(self.failed, self.reasons):
-                table.add_row(word, reason)
+            for record in self.results.failed_records():
+                table.add_row(record.word, record.reason)
             self.console.print(table)
             # self.console.print("")
         except Exception as e:
@@ -170,13 +338,13 @@ class AudioPipeline(ABC):
             )
 
     def show_results(self) -> None:
-        log.info(
-            f"Download completed: {len(self.done)} successful, {len(self.failed)} failed"
-        )
-        if not self.failed:
+        done_count = self.results.done_count
+        failed_count = self.results.failed_count
+        log.info(f"Download completed: {done_count} successful, {failed_count} failed")
+        if not failed_count:
             log.info(f"All words fetched successfully!")
-        elif self.failed and Confirm.ask(
-            f"Show {len(self.failed)} failed {'word' if len(self.failed)==1 else 'words'}?",
+        elif Confirm.ask(
+            f"Show {failed_count} failed {'word' if failed_count==1 else 'words'}?",
             default=True,
         ):
             log.debug(f"User decided to print failed words table")
@@ -208,6 +376,16 @@ class AudioPipeline(ABC):
         """
         pass
 
+    def indexed_audio_url(self, word: str) -> str | None:
+        """Audio URL of a word from the prebuilt URL index, `None` if it isn't indexed"""
+        if self.url_index is None:
+            return None
+        indexed = self.url_index.get(word)
+        if not indexed:
+            return None
+        log.debug("Audio found in index: %s", indexed[0])
+        return indexed[0]
+
     def get_audio_url(self, word: str, api_key: str | None) -> str:
         """
         Processes a word through the full audio URL pipeline: fetch, extract, normalize.
@@ -219,7 +397,11 @@ class AudioPipeline(ABC):
         Returns:
             Audio URL ready for downloading.
         """
-        log.debug(f"Fetching audio URL for: {word}")
+        indexed = self.indexed_audio_url(word)
+        if indexed:
+            return indexed
+
+        log.debug("Fetching audio URL for: %s", word)
         data = self.fetch_word_data(word, api_key)
 
         candidates = self.extract_candidate(data)
@@ -227,30 +409,131 @@ class AudioPipeline(ABC):
             raise AudioNotFound
 
         url = self.normalize_audio_url(candidates)
-        log.debug(f"Audio found: {url}")
+        log.debug("Audio found: %s", url)
         return url
 
-    def download_audio(self, word: str, api_key: str | None) -> None:
-        """Download audio for a word and save to self.output_dir. Raises DownloadError on failure."""
-        audio_url = self.get_audio_url(word, api_key)
-        if not audio_url:
-            raise DownloadError(f"Audio not found for: {word}")
+    def check_audio(self, content: bytes) -> Mp3Info:
+        """
+        Validate downloaded MP3 bytes, in the validation process pool when one is running.
+
+        Raises:
+            InvalidAudio: If the payload isn't playable audio (error page, truncated, silent).
+        """
+        if self.validator is None:
+            info = inspect_mp3(content)
+        else:
+            info = self.validator.submit(inspect_mp3, content).result()
+        if not info.valid:
+            raise InvalidAudio(info.problem)
+        log.debug("Audio is valid: %.2fs, %d kbps", info.duration, info.bitrate // 1000)
+        return info
+
+    def fetch_audio(self, audio_url: str) -> bytes:
+        """Download (and validate, if enabled) the audio at a normalized URL. Raises DownloadError on failure."""
         try:
-            audio_response = requests.get(audio_url, headers=self.headers, timeout=10)
-            if audio_response.status_code == 200:
-                file_path = self.output_dir / f"{word}.mp3"
-                with open(file_path, "wb") as f:
-                    f.write(audio_response.content)
-                log.debug(f"Saved to: {file_path}")
-            else:
-                raise DownloadError(
-                    f"Failed to download audio. Status code: {audio_response.status_code}"
+            with self.stage("download"):
+                audio_response = self.session.get(
+                    audio_url, headers=self.headers, timeout=10
                 )
+        except requests.exceptions.RequestException as re:
+            log.error("Error downloading audio: %s", re)
+            raise DownloadError(f"Error downloading audio: {re}") from re
 
+        if audio_response.status_code != 200:
+            raise DownloadError(
+                f"Failed to download audio. Status code: {audio_response.status_code}"
+            )
+        if self.validate_audio:
+            with self.stage("validate"):
+                self.check_audio(audio_response.content)
+        return audio_response.content
+
+    def fetch_audio_resumable(self, audio_url: str, part_path: Path) -> bytes:
+        """
+        Like `fetch_audio`, but stream into `part_path` and resume it with a range
+        request when it holds the start of an earlier attempt.
+
+        The part file is kept when the download fails, so the next attempt picks up
+        from there. If a resumed file fails validation it is downloaded once more
+        from scratch, in case the two halves came from different versions.
+        """
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = dict(self.headers or {})
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        try:
+            with self.stage("download"):
+                with self.session.get(
+                    audio_url, headers=headers, timeout=10, stream=True
+                ) as audio_response:
+                    status = audio_response.status_code
+                    # 416: the part already holds the whole file
+                    if status not in (200, 206) and not (status == 416 and offset):
+                        raise DownloadError(
+                            f"Failed to download audio. Status code: {status}"
+                        )
+                    if status != 416:
+                        # A 200 means the server ignored the range, start over
+                        with open(part_path, "ab" if status == 206 else "wb") as f:
+                            for chunk in audio_response.iter_content(DOWNLOAD_CHUNK):
+                                f.write(chunk)
         except requests.exceptions.RequestException as re:
-            log.error(f"Error downloading audio: {re}")
+            log.error("Error downloading audio: %s", re)
+            raise DownloadError(f"Error downloading audio: {re}") from re
 
-    def run(self, words: list, api: str | None) -> None:
+        content = part_path.read_bytes()
+        if self.validate_audio:
+            try:
+                with self.stage("validate"):
+                    self.check_audio(content)
+            except InvalidAudio:
+                part_path.unlink(missing_ok=True)
+                if not offset:
+                    raise
+                log.debug("Resumed audio is invalid, downloading again: %s", audio_url)
+                return self.fetch_audio_resumable(audio_url, part_path)
+        return content
+
+    def resolve_audio(self, word: str, api_key: str | None) -> None:
+        """Resolve the audio URL of a word into self.manifest without downloading it"""
+        with self.stage("lookup"):
+            audio_url = self.get_audio_url(word, api_key)
+        if not audio_url:
+            raise DownloadError(f"Audio not found for: {word}")
+        self.manifest.write(word, audio_url)
+
+    def download_audio(self, word: str, api_key: str | None) -> None:
+        """Download audio for a word and hand it to self.sink. Raises DownloadError on failure."""
+        with self.stage("lookup"):
+            audio_url = self.get_audio_url(word, api_key)
+        if not audio_url:
+            raise DownloadError(f"Audio not found for: {word}")
+        # Invalid audio is usually a transient error page, the URL itself is fine
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                content = self.fetch_audio(audio_url)
+                break
+            except InvalidAudio as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                log.debug("Retrying %s after invalid audio: %s", word, e)
+        location = self.sink.write(word, content)
+        log.debug("Saved to: %s", location)
+
+    def run(self, words: list, api: str | None, workers: int = 1) -> list[str]:
+        """
+        Process words, close the sink and show the results.
+
+        Returns:
+            Words that failed. The result store is closed once the run is over.
+        """
         log.info(f"Starting download with {self.name} for {len(words)} words")
-        self.process_words(words, api)
-        self.show_results()
+        try:
+            try:
+                self.process_words(words, api, workers)
+            finally:
+                self.sink.close()
+            self.show_results()
+            return self.failed
+        finally:
+            self.results.close()
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zipfile
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from common.constants import OUTPUT_INDEX_NAME
+
+log = logging.getLogger("pf.audio.sinks")
+
+OUTPUT_FORMATS = ("files", "zip", "anki")
+OUTPUT_LAYOUTS = ("flat", "prefix", "hash")
+ARCHIVE_INDEX_NAME = "index.json"
+ANKI_MEDIA_INDEX_NAME = "media"
+
+
+class AudioSink(ABC):
+    """Destination for downloaded audio. Implementations must be safe to write from many threads"""
+
+    @abstractmethod
+    def write(self, word: str, data: bytes) -> str:
+        """
+        Store the audio for a word.
+
+        Returns:
+            Where the audio ended up (file path or archive entry), for logging.
+        """
+        pass
+
+    def __contains__(self, word: str) -> bool:
+        """Whether audio for the word is already stored. Sinks without an index say no"""
+        return False
+
+    def close(self) -> None:
+        """Flush and finalize the output"""
+        pass
+
+    def __enter__(self) -> "AudioSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def shard_path(word: str, layout: str) -> str:
+    """
+    Relative path of a word's audio file for the given layout.
+
+    - flat: `dog.mp3`
+    - prefix: `d/do/dog.mp3`, words not starting with a letter go to `number/`,
+      like Merriam-Webster's own audio buckets. Spaces and punctuation in the
+      prefix become `_` (`a/a_/a cappella.mp3`), as some file systems reject
+      folder names ending in a space or dot
+    - hash: `3b/1d/dog.mp3`, from the word's SHA-1, for an even spread
+    """
+    file_name = f"{word}.mp3"
+    if layout == "flat":
+        return file_name
+    if layout == "prefix":
+        if not word[:1].isalpha():
+            return f"number/{file_name}"
+        prefix = re.sub(r"\W", "_", word[:2])
+        return f"{prefix[:1]}/{prefix}/{file_name}"
+    if layout == "hash":
+        digest = hashlib.sha1(word.encode("utf-8")).hexdigest()
+        return f"{digest[:2]}/{digest[2:4]}/{file_name}"
+    raise ValueError(f"Unknown output layout: {layout}")
+
+
+class DirectorySink(AudioSink):
+    """
+    `{word}.mp3` files in a directory, the default output.
+
+    With a sharded `layout` (see `shard_path`), files are spread over
+    subdirectories so no single directory grows huge. Every write is appended to
+    an index file at the root (`OUTPUT_INDEX_NAME`, word and relative path per
+    line), so lookups and existence checks never scan the tree.
+    """
+
+    def __init__(self, output_dir: Path, layout: str = "flat"):
+        if layout not in OUTPUT_LAYOUTS:
+            raise ValueError(f"Unknown output layout: {layout}")
+        self.output_dir = output_dir
+        self.layout = layout
+        self._index: dict[str, str] | None = None
+        self._index_file = None
+        self._created_dirs: set[Path] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def indexed(self) -> bool:
+        return self.layout != "flat"
+
+    @property
+    def index_path(self) -> Path:
+        return self.output_dir / OUTPUT_INDEX_NAME
+
+    def _load_index(self) -> dict[str, str]:
+        if self._index is None:
+            self._index = {}
+            if self.index_path.exists():
+                with open(self.index_path, encoding="utf-8") as f:
+                    for line in f:
+                        word, _, relative = line.rstrip("\n").partition("\t")
+                        # Later lines win, a word rewritten gets a new line
+                        self._index[word] = relative
+                log.debug(
+                    "Loaded %d entries from %s", len(self._index), self.index_path
+                )
+        return self._index
+
+    def __contains__(self, word: str) -> bool:
+        if not self.indexed:
+            return (self.output_dir / shard_path(word, self.layout)).exists()
+        with self._lock:
+            return word in self._load_index()
+
+    def write(self, word: str, data: bytes) -> str:
+        relative = shard_path(word, self.layout)
+        file_path = self.output_dir / relative
+        parent = file_path.parent
+        if parent not in self._created_dirs:
+            parent.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(parent)
+        # Written aside and renamed, so an interrupted write never leaves a
+        # truncated `{word}.mp3` that later runs would take as saved
+        temp_path = file_path.with_name(
+            f".{file_path.name}.{os.getpid()}-{threading.get_ident()}.tmp"
+        )
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, file_path)
+
+        if self.indexed:
+            with self._lock:
+                index = self._load_index()
+                if index.get(word) != relative:
+                    if self._index_file is None:
+                        self._index_file = open(self.index_path, "a", encoding="utf-8")
+                    self._index_file.write(f"{word}\t{relative}\n")
+                    self._index_file.flush()
+                    index[word] = relative
+        return str(file_path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._index_file is not None:
+                self._index_file.close()
+                self._index_file = None
+
+
+class ZipSink(AudioSink):
+    """
+    Stream audio into a single zip archive as each download finishes.
+
+    Entries are stored uncompressed (MP3 doesn't compress further). On `close()`
+    an index of word -> entry name is written into the archive as `index.json`.
+    """
+
+    index_name = ARCHIVE_INDEX_NAME
+
+    def __init__(self, archive_path: Path):
+        self.archive_path = archive_path
+        self.index: dict[str, str] = {}
+        self._archive: zipfile.ZipFile | None = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def entry_name(self, word: str) -> str:
+        return f"{word}.mp3"
+
+    def build_index(self) -> dict[str, str]:
+        return self.index
+
+    def write(self, word: str, data: bytes) -> str:
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"Archive already finalized: {self.archive_path}")
+            if self._archive is None:
+                self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+                self._archive = zipfile.ZipFile(
+                    self.archive_path, "w", compression=zipfile.ZIP_STORED
+                )
+                log.debug("Writing audio to archive: %s", self.archive_path)
+            if word in self.index:
+                # Zip entries can't be replaced, keep the first copy
+                return f"{self.archive_path}:{self.index[word]}"
+            entry = self.entry_name(word)
+            self._archive.writestr(entry, data)
+            self.index[word] = entry
+        return f"{self.archive_path}:{entry}"
+
+    def close(self) -> None:
+        with self._lock:
+            if self._archive is None:
+                return
+            self._closed = True
+            self._archive.writestr(
+                self.index_name, json.dumps(self.build_index(), ensure_ascii=False)
+            )
+            self._archive.close()
+            self._archive = None
+            log.info(f'Saved {len(self.index)} audio files to "{self.archive_path}"')
+
+
+class AnkiMediaSink(ZipSink):
+    """
+    Zip laid out like the media part of an Anki package.
+
+    Entries are numbered (`0`, `1`, ...) and the `media` index maps each number
+    to the file name Anki will use, `{word}.mp3`.
+    """
+
+    index_name = ANKI_MEDIA_INDEX_NAME
+
+    def entry_name(self, word: str) -> str:
+        return str(len(self.index))
+
+    def build_index(self) -> dict[str, str]:
+        return {entry: f"{word}.mp3" for word, entry in self.index.items()}
+
+
+def create_sink(
+    output_format: str, output_dir: Path, provider: str, layout: str = "flat"
+) -> AudioSink:
+    """
+    Build the sink for one of `OUTPUT_FORMATS`. Archives get a per-run file name,
+    `layout` applies to loose files only.
+    """
+    if output_format == "files":
+        return DirectorySink(output_dir, layout)
+
+    slug = re.sub(r"[^a-z0-9]+", "-", provider.lower()).strip("-") or "audio"
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    archive_path = output_dir / f"pronunciations-{slug}-{stamp}.zip"
+    if output_format == "zip":
+        return ZipSink(archive_path)
+    if output_format == "anki":
+        return AnkiMediaSink(archive_path)
+    raise ValueError(f"Unknown output format: {output_format}")
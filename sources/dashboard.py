@@ -0,0 +1,113 @@
+import threading
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from rich.console import Console, Group
+from rich.live import Live
+from rich.table import Table
+from typing import Iterator
+
+
+REFRESH_PER_SECOND = 4
+
+
+class PipelineDashboard:
+    """
+    Live progress view for a pipeline run, redrawn at a fixed rate.
+
+    Workers only bump counters under a lock; rendering happens on rich's refresh
+    thread `REFRESH_PER_SECOND` times a second, no matter how many words finish
+    in between. Safe to update from any number of threads.
+    """
+
+    def __init__(
+        self,
+        total: int,
+        console: Console,
+        description: str = "Processing words...",
+        refresh_per_second: float = REFRESH_PER_SECOND,
+    ):
+        self.total = total
+        self.description = description
+        self.completed = 0
+        self.skipped = 0
+        self.failures: Counter[str] = Counter()
+        self.in_flight: Counter[tuple[str, str]] = Counter()
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._live = Live(
+            self,
+            console=console,
+            refresh_per_second=refresh_per_second,
+            transient=False,
+        )
+
+    def __enter__(self) -> "PipelineDashboard":
+        self._started = time.perf_counter()
+        self._live.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._live.stop()
+
+    @contextmanager
+    def track(self, provider: str, stage: str) -> Iterator[None]:
+        """Count a word as in flight in `stage` for the duration of the block"""
+        key = (provider, stage)
+        with self._lock:
+            self.in_flight[key] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight[key] -= 1
+
+    def advance(self, failure_reason: str | None = None) -> None:
+        with self._lock:
+            self.completed += 1
+            if failure_reason:
+                self.failures[failure_reason] += 1
+
+    def skip(self) -> None:
+        """Account for a word that needs no processing, it doesn't count towards the rate"""
+        with self._lock:
+            self.skipped += 1
+
+    def __rich__(self) -> Group:
+        with self._lock:
+            completed = self.completed
+            skipped = self.skipped
+            failures = dict(self.failures)
+            in_flight = {key: count for key, count in self.in_flight.items() if count}
+
+        elapsed = time.perf_counter() - self._started
+        rate = completed / elapsed if elapsed > 0 else 0.0
+        done = completed + skipped
+        remaining = self.total - done
+        eta = f"{remaining / rate:.0f}s" if rate and remaining else "-"
+        percentage = done / self.total * 100 if self.total else 100
+
+        summary = Table.grid(padding=(0, 2))
+        summary.add_row(
+            f"[progress.description]{self.description}",
+            f"[progress.percentage]{percentage:>3.0f}%",
+            f"{done}/{self.total}",
+            f"{rate:.1f} words/s",
+            f"ETA {eta}",
+            f"[red]{sum(failures.values())} failed",
+            f"[dim]{skipped} skipped" if skipped else "",
+        )
+        parts = [summary]
+
+        if in_flight:
+            stages = Table("Provider", "Stage", "In flight", box=None, padding=(0, 2))
+            for (provider, stage), count in sorted(in_flight.items()):
+                stages.add_row(provider, stage, str(count))
+            parts.append(stages)
+        if failures:
+            reasons = Table("Failure", "Count", box=None, padding=(0, 2))
+            for reason, count in sorted(failures.items(), key=lambda i: -i[1]):
+                reasons.add_row(reason, str(count))
+            parts.append(reasons)
+        return Group(*parts)
@@ -0,0 +1,204 @@
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from pathlib import Path
+from rich.console import Console
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, TimeRemainingColumn
+
+from common.setup_logger import setup_logger
+from sources.audio_pipeline import AudioPipeline
+from sources.audio_sinks import create_sink
+from sources.mp3_validation import validator_pool
+from sources.results import DONE, FAILED, ResultStore
+from sources.url_index import UrlIndex
+from sources.work_queue import LEASE_SECONDS, LEASED, PENDING, WorkQueue
+
+
+log = logging.getLogger("pf.distributed")
+
+BATCH_SIZE = 20
+IDLE_POLL_SECONDS = 2.0
+STATUS_REFRESH_SECONDS = 1.0
+
+
+class LeaseKeeper(threading.Thread):
+    """Background heartbeat that keeps the leases on a worker's current batch alive"""
+
+    def __init__(self, queue: WorkQueue, provider: str, owner: str):
+        super().__init__(name="pf-lease-keeper", daemon=True)
+        self.queue = queue
+        self.provider = provider
+        self.owner = owner
+        self.words: list[str] = []
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        interval = self.queue.lease_seconds / 3
+        while not self._stopped.wait(interval):
+            words = self.words
+            if not words:
+                continue
+            try:
+                extended = self.queue.heartbeat(self.provider, self.owner, words)
+            except sqlite3.Error as e:
+                # e.g. "database is locked" on a busy network share, try again
+                # on the next beat rather than letting the leases run out
+                log.warning(f"Heartbeat failed, retrying: {e}")
+                continue
+            log.debug("Heartbeat extended %d of %d leases", extended, len(words))
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def run_worker(
+    queue_path: Path,
+    provider: str,
+    provider_class: type[AudioPipeline],
+    output_dir: Path,
+    api: str | None = None,
+    threads: int = 1,
+    batch_size: int = BATCH_SIZE,
+    lease_seconds: float = LEASE_SECONDS,
+    output_format: str = "files",
+    layout: str = "flat",
+    validate_audio: bool = True,
+    follow: bool = False,
+    log_dir: Path | None = None,
+    url_index_dir: Path | None = None,
+    queue_logging: bool = False,
+    log_sample: float = 1.0,
+) -> None:
+    """
+    Pull words for `provider` from the shared queue and run them through `provider_class`.
+
+    Words are leased in batches of `batch_size`, processed with the regular
+    `AudioPipeline.process_words` on `threads` threads, and their outcomes
+    reported back to the queue. Returns when the queue is drained, or keeps
+    polling for new words with `follow`.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    if log_dir is not None:
+        setup_logger(
+            name="pf",
+            log_file_dir=log_dir,
+            log_file_name=f"worker-{os.getpid()}.log",
+            use_queue=queue_logging,
+            debug_sample_rate=log_sample,
+        )
+    queue = WorkQueue(queue_path, lease_seconds)
+    # Archives can't be shared between processes, every worker writes its own
+    sink = create_sink(output_format, output_dir, f"{provider}-{os.getpid()}", layout)
+    url_index = None
+    if url_index_dir is not None:
+        url_index = UrlIndex.for_provider(url_index_dir, provider)
+    pipeline = provider_class(
+        output_dir, sink=sink, validate_audio=validate_audio, url_index=url_index
+    )
+    # Progress is reported centrally from the queue, keep worker terminals quiet
+    pipeline.console = Console(quiet=True)
+    if validate_audio:
+        # One validation process for the worker's lifetime instead of one per batch
+        pipeline.validator = validator_pool()
+
+    keeper = LeaseKeeper(queue, provider, owner)
+    keeper.start()
+    log.debug(f"Worker {owner} started for {provider}")
+    words: list[str] = []
+    processed = 0
+    try:
+        while True:
+            words = queue.lease(provider, owner, batch_size)
+            if not words:
+                if not follow:
+                    break
+                time.sleep(IDLE_POLL_SECONDS)
+                continue
+            keeper.words = words
+            pipeline.results = ResultStore(provider=pipeline.name)
+            pipeline.process_words(words, api, threads)
+            accepted = queue.complete(provider, owner, pipeline.results.records())
+            pipeline.results.close()
+            if accepted < len(words):
+                log.debug(
+                    "%d outcomes arrived after their lease expired",
+                    len(words) - accepted,
+                )
+            processed += accepted
+            keeper.words = words = []
+    finally:
+        keeper.stop()
+        if words:
+            queue.release(provider, owner, words)
+        sink.close()
+        if pipeline.validator is not None:
+            pipeline.validator.shutdown()
+        log.debug(f"Worker {owner} finished, {processed} words processed")
+
+
+def run_workers(
+    processes: int,
+    queue_path: Path,
+    provider: str,
+    console: Console,
+    **worker_options,
+) -> dict[str, int]:
+    """
+    Start `processes` local workers on the queue and show overall progress until they exit.
+
+    Returns:
+        Final word counts per queue state for the provider.
+    """
+    queue = WorkQueue(queue_path, worker_options.get("lease_seconds", LEASE_SECONDS))
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(
+            target=run_worker,
+            args=(queue_path, provider),
+            kwargs=worker_options,
+            name=f"pf-worker-{i}",
+        )
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    progress = Progress(
+        "[progress.description]{task.description}",
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeRemainingColumn(),
+        "{task.fields[status]}",
+        console=console,
+    )
+
+    def refresh() -> dict[str, int]:
+        counts = queue.counts(provider)
+        progress.update(
+            task,
+            total=sum(counts.values()),
+            completed=counts[DONE] + counts[FAILED],
+            status=(
+                f"{counts[LEASED]} leased, {counts[PENDING]} pending, "
+                f"[red]{counts[FAILED]} failed"
+            ),
+        )
+        return counts
+
+    with progress:
+        task = progress.add_task(f"{provider} ({processes} workers)", status="")
+        while any(worker.is_alive() for worker in workers):
+            refresh()
+            time.sleep(STATUS_REFRESH_SECONDS)
+        counts = refresh()
+
+    for worker in workers:
+        worker.join()
+        if worker.exitcode:
+            log.error(f"{worker.name} exited with code {worker.exitcode}")
+    return counts
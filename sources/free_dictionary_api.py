@@ -10,8 +10,8 @@ log = logging.getLogger("pf.audio.free_dict")
 
 class FreeDictAPIFetcher(AudioPipeline):
 
-    def __init__(self, output_dir):
-        super().__init__(output_dir, name="FreeDict API")
+    def __init__(self, output_dir, **kwargs):
+        super().__init__(output_dir, name="FreeDict API", **kwargs)
         self.country_codes = ["us"]
 
     def get_word_url(self, word: str, api_key: str):
@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import threading
+import time
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from sources.audio_pipeline import AudioPipeline, Outcome
+
+
+log = logging.getLogger("pf.audio.manifest")
+
+MANIFEST_HEADER = "word\tprovider\turl"
+PARTS_DIR_NAME = ".pf-parts"
+PART_SUFFIX = ".part"
+BULK_CONNECTIONS = 32
+
+
+@dataclass(frozen=True, slots=True)
+class ManifestEntry:
+    word: str
+    provider: str
+    url: str
+
+
+class ManifestWriter:
+    """
+    Append resolved audio URLs to a manifest, one `word provider url` line per word.
+
+    The manifest is a tab-separated text file with a header line. Lines are
+    appended and flushed as words are resolved, so an interrupted run keeps what
+    it resolved and several runs (or providers) can add to the same file.
+    """
+
+    def __init__(self, path: Path, provider: str):
+        self.path = path
+        self.provider = provider
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        new_file = not path.exists() or path.stat().st_size == 0
+        self._file = open(path, "a", encoding="utf-8")
+        if new_file:
+            self._file.write(f"{MANIFEST_HEADER}\n")
+            self._file.flush()
+
+    def write(self, word: str, url: str) -> None:
+        with self._lock:
+            self._file.write(f"{word}\t{self.provider}\t{url}\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "ManifestWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_manifest(path: Path) -> Iterator[ManifestEntry]:
+    """Entries of a manifest in file order. Malformed lines are logged and skipped"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.rstrip("\n")
+            if not line or line == MANIFEST_HEADER:
+                continue
+            fields = line.split("\t")
+            if len(fields) != 3 or not all(fields):
+                log.warning(f"Skipping malformed line {line_number} in {path}")
+                continue
+            yield ManifestEntry(*fields)
+
+
+def part_path(parts_dir: Path, audio_url: str) -> Path:
+    """Where a partial download of `audio_url` is kept between attempts"""
+    digest = hashlib.sha1(audio_url.encode("utf-8")).hexdigest()
+    return parts_dir / f"{digest}{PART_SUFFIX}"
+
+
+def download_manifest(
+    pipeline: "AudioPipeline",
+    entries: list[ManifestEntry],
+    parts_dir: Path,
+    connections: int = BULK_CONNECTIONS,
+) -> None:
+    """
+    Download the audio of manifest entries into the pipeline's sink.
+
+    Each distinct URL is fetched once, however many words share it, and written
+    under every one of those words. Downloads stream into `.part` files in
+    `parts_dir` and resume with a range request if a previous run was cut
+    short. Words already in the sink are skipped, so a rerun picks up where the
+    last one stopped. Outcomes are recorded in the pipeline's `results`.
+    """
+    words_by_url: dict[str, list[str]] = {}
+    queued: set[str] = set()
+    skipped = 0
+    for entry in entries:
+        if entry.word in queued:
+            continue
+        if entry.word in pipeline.results or entry.word in pipeline.sink:
+            skipped += 1
+            continue
+        queued.add(entry.word)
+        words_by_url.setdefault(entry.url, []).append(entry.word)
+    log.info(
+        f"Downloading {len(words_by_url)} distinct URLs for {len(queued)} words, "
+        f"{skipped} already saved"
+    )
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    def download(audio_url: str) -> list["Outcome"]:
+        started = time.perf_counter()
+        path = part_path(parts_dir, audio_url)
+        words = words_by_url[audio_url]
+        try:
+            content = pipeline.fetch_audio_resumable(audio_url, path)
+            for word in words:
+                location = pipeline.sink.write(word, content)
+                log.debug("Saved to: %s", location)
+            path.unlink(missing_ok=True)
+        except Exception as e:
+            return [(word, time.perf_counter() - started, e) for word in words]
+        return [(word, time.perf_counter() - started, None) for word in words]
+
+    pipeline.run_tasks(
+        words_by_url,
+        download,
+        connections,
+        total=len(queued),
+        description="Downloading...",
+    )
+    if not any(parts_dir.iterdir()):
+        parts_dir.rmdir()
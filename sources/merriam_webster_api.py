@@ -10,8 +10,8 @@ logger = logging.getLogger("pf.audio.mw_dict")
 
 class MerriamWebsterDictAPIFetcher(AudioPipeline):
 
-    def __init__(self, output_dir):
-        super().__init__(output_dir, name="Merriam-Webster API")
+    def __init__(self, output_dir, **kwargs):
+        super().__init__(output_dir, name="Merriam-Webster API", **kwargs)
         self.country_codes = ["uk", "us"]
 
     def get_word_url(self, word: str, api_key: str) -> str:
@@ -0,0 +1,200 @@
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+
+MIN_DURATION = 0.2  # seconds, anything shorter can't hold a spoken word
+MIN_FRAMES = 2
+# Share of frame payload made of filler bytes above which a clip is treated as silent
+SILENT_FILLER_RATIO = 0.9
+FILLER_BYTES = (0x00, 0x55, 0xFF)
+
+# Bitrates in kbps, indexed by the 4-bit header field; 0 is "free", 15 is invalid
+BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+SAMPLE_RATES = {
+    1: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    25: (11025, 12000, 8000),
+}
+# Header version bits -> MPEG version (2.5 stored as 25), 1 is reserved
+VERSIONS = {0: 25, 2: 2, 3: 1}
+# Header layer bits -> layer number, 0 is reserved
+LAYERS = {1: 3, 2: 2, 3: 1}
+
+
+@dataclass(frozen=True, slots=True)
+class FrameHeader:
+    version: int
+    layer: int
+    bitrate: int
+    sample_rate: int
+    length: int
+    samples: int
+
+
+@dataclass(frozen=True, slots=True)
+class Mp3Info:
+    """Result of `inspect_mp3`. `problem` is empty for a usable clip"""
+
+    frames: int = 0
+    duration: float = 0.0
+    bitrate: int = 0
+    truncated: bool = False
+    silent: bool = False
+    problem: str = ""
+
+    @property
+    def valid(self) -> bool:
+        return not self.problem
+
+
+def parse_frame_header(data: bytes, offset: int) -> FrameHeader | None:
+    """Decode the 4-byte MPEG audio frame header at `offset`, `None` if it isn't one"""
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+
+    version = VERSIONS.get((b1 >> 3) & 0b11)
+    layer = LAYERS.get((b1 >> 1) & 0b11)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0b11
+    if (
+        version is None
+        or layer is None
+        or bitrate_index in (0, 15)
+        or sample_rate_index == 3
+    ):
+        return None
+
+    bitrate = BITRATES[(min(version, 2), layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and version != 1:
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+    else:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    return FrameHeader(version, layer, bitrate, sample_rate, length, samples)
+
+
+def _skip_id3v2(data: bytes) -> int:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _audio_end(data: bytes) -> int:
+    """Offset where audio frames stop, excluding a trailing ID3v1 tag"""
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        return len(data) - 128
+    return len(data)
+
+
+def _find_first_frame(data: bytes, start: int, end: int, resync: bool = False) -> int:
+    """
+    Find the first frame header that is followed by another one (avoids false syncs).
+
+    The first frame of a clip may run past `end`, which is how truncation is
+    detected. When resynchronising after junk the frame must fit before `end`,
+    otherwise a stray 0xFF 0xE? pair in trailing junk would pass for a cut frame.
+    """
+    offset = data.find(b"\xff", start, end)
+    while offset != -1:
+        header = parse_frame_header(data, offset)
+        if header is not None:
+            following = offset + header.length
+            if following > end:
+                if not resync:
+                    return offset
+            elif following == end or parse_frame_header(data, following) is not None:
+                return offset
+        offset = data.find(b"\xff", offset + 1, end)
+    return -1
+
+
+def inspect_mp3(data: bytes) -> Mp3Info:
+    """
+    Walk the MPEG frames of an MP3 payload and report what was found.
+
+    The payload is rejected when no frame sync is found (e.g. an HTML error page),
+    when the last frame runs past the end of the data (truncated body), when the
+    clip is too short to hold a word, or when nearly every payload byte is filler,
+    which is what encoders emit for silence. The silence check is a heuristic,
+    it doesn't decode audio.
+
+    Args:
+        data: Raw bytes as downloaded.
+
+    Returns:
+        Mp3Info with frame count, duration, average bitrate and the problem found, if any.
+    """
+    end = _audio_end(data)
+    offset = _find_first_frame(data, _skip_id3v2(data), end)
+    if offset == -1:
+        return Mp3Info(problem="No MPEG audio frames")
+
+    frames = 0
+    duration = 0.0
+    audio_bytes = 0
+    filler = 0
+    truncated = False
+    while offset < end:
+        header = parse_frame_header(data, offset)
+        if header is None:
+            # Resynchronise past junk between frames
+            offset = _find_first_frame(data, offset + 1, end, resync=True)
+            if offset == -1:
+                # Whatever is left is trailing junk, not a cut frame
+                break
+            continue
+        if offset + header.length > end:
+            truncated = True
+            break
+        payload = data[offset + 4 : offset + header.length]
+        filler += max(payload.count(byte) for byte in FILLER_BYTES)
+        audio_bytes += header.length
+        duration += header.samples / header.sample_rate
+        frames += 1
+        offset += header.length
+
+    bitrate = int(audio_bytes * 8 / duration) if duration else 0
+    silent = bool(audio_bytes) and filler / audio_bytes >= SILENT_FILLER_RATIO
+    if truncated:
+        problem = "Truncated audio"
+    elif frames < MIN_FRAMES or duration < MIN_DURATION:
+        problem = "Audio too short"
+    elif silent:
+        problem = "Silent audio"
+    else:
+        problem = ""
+    return Mp3Info(frames, duration, bitrate, truncated, silent, problem)
+
+
+def validator_pool(max_workers: int = 1) -> ProcessPoolExecutor:
+    """
+    Process pool for running `inspect_mp3` off the I/O threads.
+
+    Started with "spawn": pools are created while HTTP, dashboard and logging
+    threads are running, and forking a multi-threaded process can deadlock.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    )
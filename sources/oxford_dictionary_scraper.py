@@ -12,11 +12,12 @@ log = logging.getLogger("pf.audio.oxford_dict_scrape")
 
 class OxfordDictScraper(AudioPipeline):
 
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, **kwargs):
         super().__init__(
             output_dir,
             name="Oxford Learner's Dictionary",
             process_name="Scraping",
+            **kwargs,
         )
         self.headers = {
             "User-Agent": (
@@ -0,0 +1,173 @@
+import csv
+import logging
+import tempfile
+
+from pathlib import Path
+from typing import Iterator
+
+
+log = logging.getLogger("pf.audio.results")
+
+DONE = "done"
+FAILED = "failed"
+
+
+class WordResult:
+    """Outcome of processing a single word, with all of its fields kept together"""
+
+    __slots__ = ("word", "status", "reason", "provider", "latency")
+
+    def __init__(
+        self,
+        word: str,
+        status: str,
+        reason: str = "",
+        provider: str = "",
+        latency: float = 0.0,
+    ):
+        self.word = word
+        self.status = status
+        self.reason = reason
+        self.provider = provider
+        self.latency = latency
+
+    def as_row(self) -> tuple[str, str, str, str, str]:
+        return self.word, self.status, self.reason, self.provider, f"{self.latency:.6f}"
+
+    @classmethod
+    def from_row(cls, row: list[str]) -> "WordResult":
+        word, status, reason, provider, latency = row
+        return cls(word, status, reason, provider, float(latency))
+
+    def __repr__(self) -> str:
+        return f"WordResult({self.word!r}, {self.status!r}, reason={self.reason!r})"
+
+
+class ResultStore:
+    """
+    Bookkeeping for a pipeline run.
+
+    Membership checks go through per-status sets, so looking up a word is O(1)
+    regardless of run size. A word has exactly one record: recording it again
+    replaces the previous outcome, so a reason can never drift away from its word.
+
+    With `spill_threshold` set, records are flushed to a temporary TSV file once
+    that many are held in memory. Only the word sets stay resident; records are
+    read back from disk when iterated.
+
+    `close()` drops the spill file. Counts and membership checks keep working
+    after that, but reading or adding records raises ValueError instead of
+    returning only the part that was still in memory.
+
+    Args:
+        provider: Provider name attached to every record.
+        spill_threshold: Number of in-memory records that triggers a flush to disk.
+            `None` keeps everything in memory.
+        spill_dir: Directory for the spill file (system temp dir by default).
+    """
+
+    def __init__(
+        self,
+        provider: str = "",
+        spill_threshold: int | None = None,
+        spill_dir: Path | None = None,
+    ):
+        self.provider = provider
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self._done: set[str] = set()
+        self._failed: set[str] = set()
+        self._records: dict[str, WordResult] = {}
+        self._spill_file = None
+        self._closed = False
+        # Number of outdated spill rows per re-recorded word
+        self._superseded: dict[str, int] = {}
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._done or word in self._failed
+
+    def __len__(self) -> int:
+        return len(self._done) + len(self._failed)
+
+    @property
+    def done_count(self) -> int:
+        return len(self._done)
+
+    @property
+    def failed_count(self) -> int:
+        return len(self._failed)
+
+    def is_done(self, word: str) -> bool:
+        return word in self._done
+
+    def is_failed(self, word: str) -> bool:
+        return word in self._failed
+
+    def add_done(self, word: str, latency: float = 0.0) -> None:
+        self._store(WordResult(word, DONE, provider=self.provider, latency=latency))
+
+    def add_failed(self, word: str, reason: str, latency: float = 0.0) -> None:
+        self._store(WordResult(word, FAILED, reason, self.provider, latency))
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise ValueError("Records of a closed ResultStore are gone")
+
+    def _store(self, record: WordResult) -> None:
+        self._check_open()
+        word = record.word
+        if word in self and word not in self._records:
+            # The previous record is in the spill file, skip it when reading back
+            self._superseded[word] = self._superseded.get(word, 0) + 1
+        if record.status == DONE:
+            self._failed.discard(word)
+            self._done.add(word)
+        else:
+            self._done.discard(word)
+            self._failed.add(word)
+        self._records[word] = record
+        if self.spill_threshold and len(self._records) >= self.spill_threshold:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(
+                mode="w+", encoding="utf-8", newline="", dir=self.spill_dir
+            )
+            log.debug(f"Spilling results to disk after {len(self._records)} records")
+        self._spill_file.seek(0, 2)
+        csv.writer(self._spill_file, delimiter="\t").writerows(
+            record.as_row() for record in self._records.values()
+        )
+        self._records.clear()
+
+    def records(self) -> Iterator[WordResult]:
+        """Yield the latest record of every word, spilled ones first"""
+        self._check_open()
+        if self._spill_file is not None:
+            self._spill_file.flush()
+            self._spill_file.seek(0)
+            skip = dict(self._superseded)
+            for row in csv.reader(self._spill_file, delimiter="\t"):
+                if skip.get(row[0]):
+                    skip[row[0]] -= 1
+                    continue
+                yield WordResult.from_row(row)
+            self._spill_file.seek(0, 2)
+        yield from self._records.values()
+
+    def failed_records(self) -> Iterator[WordResult]:
+        return (record for record in self.records() if record.status == FAILED)
+
+    def done_words(self) -> list[str]:
+        return [record.word for record in self.records() if record.status == DONE]
+
+    def failed_words(self) -> list[str]:
+        return [record.word for record in self.failed_records()]
+
+    def close(self) -> None:
+        """Drop the spill file. Records can't be read or added after this"""
+        self._closed = True
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
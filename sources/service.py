@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Hashable
+from urllib.parse import parse_qs, urlsplit
+
+from common.validation import validate_word
+from sources.audio_pipeline import (
+    AudioNotFound,
+    AudioPipeline,
+    DownloadError,
+    WordNotFound,
+)
+from sources.mp3_validation import validator_pool
+
+
+log = logging.getLogger("pf.audio.service")
+
+URL_CACHE_SIZE = 50_000
+AUDIO_CACHE_BYTES = 256 * 1024 * 1024
+# Upper bound on validation processes, fewer on machines with fewer cores
+VALIDATOR_PROCESSES = 8
+
+
+class BadRequest(Exception):
+    """The request itself is invalid (unknown provider, invalid word)"""
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    running wait for its result (or exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by total weight (entry count by default)"""
+
+    def __init__(self, max_weight: int, weigh: Callable[[Any], int] = lambda _: 1):
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self._items: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        weight = self.weigh(value)
+        if weight > self.max_weight:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.weight -= self.weigh(previous)
+            self._items[key] = value
+            self.weight += weight
+            while self.weight > self.max_weight:
+                _, evicted = self._items.popitem(last=False)
+                self.weight -= self.weigh(evicted)
+
+
+class PronunciationService:
+    """
+    On-demand lookups backed by long-lived fetchers.
+
+    Each provider's pipeline (and so its HTTP connection pool) is created once and
+    shared by all requests. Results are cached, and concurrent requests for the
+    same (provider, word) are coalesced into a single upstream lookup.
+
+    Args:
+        pipelines: Provider key -> (pipeline, API key) for every provider to serve.
+    """
+
+    def __init__(
+        self,
+        pipelines: dict[str, tuple[AudioPipeline, str | None]],
+        url_cache_size: int = URL_CACHE_SIZE,
+        audio_cache_bytes: int = AUDIO_CACHE_BYTES,
+        validator_processes: int = VALIDATOR_PROCESSES,
+    ):
+        self.pipelines = pipelines
+        self.flights = SingleFlight()
+        self.urls = LRUCache(url_cache_size)
+        self.audio_cache = LRUCache(audio_cache_bytes, weigh=len)
+        self.validator = None
+        validating = [p for p, _ in pipelines.values() if p.validate_audio]
+        if validating:
+            self.validator = validator_pool(
+                max(1, min(validator_processes, os.cpu_count() or 1))
+            )
+            for pipeline in validating:
+                pipeline.validator = self.validator
+
+    def _pipeline(self, provider: str) -> tuple[AudioPipeline, str | None]:
+        try:
+            return self.pipelines[provider]
+        except KeyError:
+            raise BadRequest(f"Unknown provider: {provider}") from None
+
+    def lookup(self, provider: str, word: str) -> str:
+        """Audio URL of a word, raises WordNotFound/AudioNotFound/DownloadError"""
+        pipeline, api_key = self._pipeline(provider)
+        key = (provider, word)
+        url = self.urls.get(key)
+        if url is None:
+            url = self.flights.do(
+                ("url", *key), lambda: pipeline.get_audio_url(word, api_key)
+            )
+            self.urls.put(key, url)
+        return url
+
+    def audio(self, provider: str, word: str) -> bytes:
+        """Validated MP3 bytes of a word"""
+        pipeline, _ = self._pipeline(provider)
+        key = (provider, word)
+        content = self.audio_cache.get(key)
+        if content is None:
+            content = self.flights.do(
+                ("audio", *key),
+                lambda: pipeline.fetch_audio(self.lookup(provider, word)),
+            )
+            self.audio_cache.put(key, content)
+        return content
+
+    def close(self) -> None:
+        if self.validator is not None:
+            self.validator.shutdown()
+        for pipeline, _ in self.pipelines.values():
+            pipeline.session.close()
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    Endpoints:
+        GET /lookup?provider=<key>&word=<word>  -> {"provider", "word", "url"}
+        GET /audio?provider=<key>&word=<word>   -> audio/mpeg
+        GET /providers                          -> list of provider keys
+    """
+
+    service: PronunciationService
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        try:
+            if parts.path == "/providers":
+                self._send_json(HTTPStatus.OK, sorted(self.service.pipelines))
+            elif parts.path == "/lookup":
+                provider, word = self._word_params(query)
+                url = self.service.lookup(provider, word)
+                self._send_json(
+                    HTTPStatus.OK, {"provider": provider, "word": word, "url": url}
+                )
+            elif parts.path == "/audio":
+                provider, word = self._word_params(query)
+                self._send(
+                    HTTPStatus.OK, self.service.audio(provider, word), "audio/mpeg"
+                )
+            else:
+                self._send_error(
+                    HTTPStatus.NOT_FOUND, f"No such endpoint: {parts.path}"
+                )
+        except BadRequest as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+        except (WordNotFound, AudioNotFound) as e:
+            self._send_error(HTTPStatus.NOT_FOUND, str(e) or type(e).__name__)
+        except (DownloadError, NotImplementedError) as e:
+            self._send_error(HTTPStatus.BAD_GATEWAY, str(e) or type(e).__name__)
+        except ValueError as e:
+            # e.g. JSONDecodeError while parsing a provider's response
+            log.debug(f"Unreadable upstream response for {self.path}: {e}")
+            self._send_error(HTTPStatus.BAD_GATEWAY, "Unreadable upstream response")
+        except Exception as e:
+            log.error(f"Unexpected error for {self.path}: {e}")
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "Unexpected error")
+
+    @staticmethod
+    def _word_params(query: dict[str, str]) -> tuple[str, str]:
+        provider = query.get("provider", "")
+        word = " ".join(query.get("word", "").lower().split())
+        validation_result = validate_word(word)
+        if validation_result != "valid":
+            raise BadRequest(f"Invalid word '{word}': {validation_result}")
+        return provider, word
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: HTTPStatus, payload: Any) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        self._send_json(status, {"error": message})
+
+    def log_message(self, format: str, *args) -> None:
+        log.debug("%s - " + format, self.address_string(), *args)
+
+
+def serve(service: PronunciationService, host: str, port: int) -> None:
+    """Serve `service` over HTTP until interrupted"""
+    handler = type("Handler", (ServiceRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    log.info(f"Serving {', '.join(sorted(service.pipelines))} on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,172 @@
+import logging
+import mmap
+import os
+import struct
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from sources.audio_pipeline import AudioPipeline
+
+
+log = logging.getLogger("pf.audio.url_index")
+
+MAGIC = b"PFIDX\x00\x01\x00"
+HEADER = struct.Struct("<8sQ")
+OFFSET = struct.Struct("<Q")
+KEY_END = b"\x00"
+URL_SEPARATOR = "\t"
+INDEX_SUFFIX = ".pfidx"
+
+
+class UrlIndex:
+    """
+    Read-only, memory-mapped index of word -> audio URL(s) for one provider.
+
+    File layout (little-endian):
+        header   8-byte magic, entry count N (uint64)
+        offsets  N + 1 uint64 record offsets into the data section
+        data     records sorted by UTF-8 key: `word \\0 url [\\t url ...]`
+
+    Opening maps the file without reading it, so load time doesn't depend on its
+    size; pages are faulted in as lookups touch them. Lookups are a binary search
+    over the sorted keys. The file is plain bytes, so it can be copied between
+    machines as is.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"Not a pronunciation URL index: {path}")
+        self._offsets_start = HEADER.size
+        self._data_start = self._offsets_start + (self._count + 1) * OFFSET.size
+
+    @classmethod
+    def for_provider(cls, index_dir: Path, provider: str) -> "UrlIndex | None":
+        """Open the provider's index in `index_dir`, `None` if it hasn't been built"""
+        path = index_path(index_dir, provider)
+        return cls(path) if path.exists() else None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _offset(self, i: int) -> int:
+        return (
+            self._data_start
+            + OFFSET.unpack_from(self._map, self._offsets_start + i * OFFSET.size)[0]
+        )
+
+    def _key(self, i: int) -> bytes:
+        start = self._offset(i)
+        return self._map[start : self._map.find(KEY_END, start)]
+
+    def _urls(self, i: int) -> list[str]:
+        start = self._offset(i)
+        record = self._map[start : self._offset(i + 1)]
+        _, _, urls = record.partition(KEY_END)
+        return urls.decode("utf-8").split(URL_SEPARATOR)
+
+    def get(self, word: str) -> list[str] | None:
+        """All URLs recorded for a word, `None` if it isn't indexed"""
+        key = word.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._key(low) == key:
+            return self._urls(low)
+        return None
+
+    def __contains__(self, word: str) -> bool:
+        return self.get(word) is not None
+
+    def items(self) -> Iterator[tuple[str, list[str]]]:
+        for i in range(self._count):
+            yield self._key(i).decode("utf-8"), self._urls(i)
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "UrlIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def index_path(index_dir: Path, provider: str) -> Path:
+    return index_dir / f"{provider}{INDEX_SUFFIX}"
+
+
+def write_index(path: Path, entries: dict[str, list[str]]) -> None:
+    """Write entries as a UrlIndex file. The file is replaced atomically"""
+    records = []
+    for word in sorted(entries, key=lambda w: w.encode("utf-8")):
+        urls = URL_SEPARATOR.join(entries[word])
+        records.append(word.encode("utf-8") + KEY_END + urls.encode("utf-8"))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records)))
+        offset = 0
+        for record in records:
+            f.write(OFFSET.pack(offset))
+            offset += len(record)
+        f.write(OFFSET.pack(offset))
+        for record in records:
+            f.write(record)
+    os.replace(temp_path, path)
+
+
+def build_index(
+    pipeline: "AudioPipeline",
+    words: Iterable[str],
+    api: str | None,
+    path: Path,
+    workers: int = 1,
+    refresh: bool = False,
+) -> tuple[int, int]:
+    """
+    Resolve words through the pipeline and write them into the index at `path`.
+
+    Builds incrementally: entries of an existing index are kept and only words
+    missing from it are resolved, unless `refresh` is set. Words that can't be
+    resolved are left out and retried on the next build.
+
+    Returns:
+        Number of words resolved in this build and total entries in the index.
+    """
+    entries: dict[str, list[str]] = {}
+    if path.exists() and not refresh:
+        with UrlIndex(path) as existing:
+            entries.update(existing.items())
+    missing = [word for word in dict.fromkeys(words) if word not in entries]
+    log.info(f"Resolving {len(missing)} words, {len(entries)} already indexed")
+
+    def resolve(word: str) -> tuple[str, str | None]:
+        try:
+            return word, pipeline.get_audio_url(word, api)
+        except Exception as e:
+            log.debug("Could not resolve %s: %s", word, e)
+            return word, None
+
+    resolved = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for word, url in pool.map(resolve, missing):
+            if url:
+                entries[word] = [url]
+                resolved += 1
+
+    write_index(path, entries)
+    log.info(f'Index saved to "{path}" with {len(entries)} entries')
+    return resolved, len(entries)
@@ -0,0 +1,250 @@
+import logging
+import sqlite3
+import time
+
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable
+
+from sources.results import DONE, FAILED, WordResult
+
+
+log = logging.getLogger("pf.queue")
+
+PENDING = "pending"
+LEASED = "leased"
+LEASE_SECONDS = 60.0
+MAX_ATTEMPTS = 3
+# `UPDATE ... RETURNING` is used to lease words atomically
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    provider      TEXT    NOT NULL,
+    word          TEXT    NOT NULL,
+    state         TEXT    NOT NULL DEFAULT 'pending',
+    owner         TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    reason        TEXT,
+    latency       REAL,
+    updated       REAL,
+    PRIMARY KEY (provider, word)
+);
+CREATE INDEX IF NOT EXISTS tasks_by_state ON tasks (provider, state, lease_expires);
+"""
+
+
+class WorkQueue:
+    """
+    Durable, SQLite-backed queue of (provider, word) tasks shared by worker processes.
+
+    Workers lease a batch of words for `lease_seconds` and keep the lease alive
+    with `heartbeat()`. A lease that expires (the worker crashed or hung) makes the
+    words available to the next `lease()` call. Outcomes are only accepted from the
+    current lease owner, so a word is recorded exactly once even if a slow worker
+    reports after its lease was handed to someone else.
+
+    Each call opens its own connection, so one instance can be shared between
+    threads, and any number of processes on the same host can open the same
+    file. Queues are created in WAL mode, which doesn't work over network file
+    systems. A queue opened with `shared` switches to the rollback journal
+    instead, so workers on several machines can use it from storage with
+    working file locks. The journal mode is stored in the file, so a queue
+    stays shared once it has been opened that way.
+
+    Args:
+        db_path: SQLite database file, created on first use.
+        lease_seconds: How long a lease lasts without a heartbeat.
+        max_attempts: Leases per word before it is recorded as failed.
+        shared: Use the rollback journal for a queue on network storage.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        lease_seconds: float = LEASE_SECONDS,
+        max_attempts: int = MAX_ATTEMPTS,
+        shared: bool = False,
+    ):
+        if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+            raise RuntimeError(
+                f"The work queue needs SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} "
+                f"or newer, this Python uses {sqlite3.sqlite_version}"
+            )
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        new_queue = not Path(db_path).exists()
+        with closing(self._connect()) as conn:
+            if shared:
+                conn.execute("PRAGMA journal_mode=DELETE")
+            elif new_queue:
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, transactions are opened explicitly where needed
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def enqueue(self, provider: str, words: Iterable[str]) -> int:
+        """Add words for a provider. Words already queued are left untouched. Returns the number added"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO tasks (provider, word, updated) VALUES (?, ?, ?)",
+                ((provider, word, now) for word in words),
+            )
+            conn.execute("COMMIT")
+        log.debug("Enqueued %d words for %s", cursor.rowcount, provider)
+        return cursor.rowcount
+
+    def lease(self, provider: str, owner: str, limit: int) -> list[str]:
+        """Take up to `limit` pending or expired words for `owner`"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._fail_exhausted(conn, provider, now)
+            rows = conn.execute(
+                """
+                UPDATE tasks
+                SET state = ?, owner = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated = ?
+                WHERE rowid IN (
+                    SELECT rowid FROM tasks
+                    WHERE provider = ?
+                      AND (state = ? OR (state = ? AND lease_expires < ?))
+                    LIMIT ?
+                )
+                RETURNING word
+                """,
+                (
+                    LEASED,
+                    owner,
+                    now + self.lease_seconds,
+                    now,
+                    provider,
+                    PENDING,
+                    LEASED,
+                    now,
+                    limit,
+                ),
+            ).fetchall()
+            conn.execute("COMMIT")
+        return [word for (word,) in rows]
+
+    def _fail_exhausted(self, conn: sqlite3.Connection, provider: str, now: float):
+        """Stop handing out words whose leases keep expiring, they likely crash the worker"""
+        conn.execute(
+            """
+            UPDATE tasks
+            SET state = ?, reason = ?, owner = NULL, lease_expires = NULL, updated = ?
+            WHERE provider = ? AND state = ? AND lease_expires < ? AND attempts >= ?
+            """,
+            (
+                FAILED,
+                f"Gave up after {self.max_attempts} expired leases",
+                now,
+                provider,
+                LEASED,
+                now,
+                self.max_attempts,
+            ),
+        )
+
+    def heartbeat(self, provider: str, owner: str, words: Iterable[str]) -> int:
+        """Extend the lease on `words` still held by `owner`. Returns how many were extended"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.executemany(
+                """
+                UPDATE tasks SET lease_expires = ?, updated = ?
+                WHERE provider = ? AND word = ? AND owner = ? AND state = ?
+                """,
+                (
+                    (now + self.lease_seconds, now, provider, word, owner, LEASED)
+                    for word in words
+                ),
+            )
+        return cursor.rowcount
+
+    def complete(self, provider: str, owner: str, records: Iterable[WordResult]) -> int:
+        """
+        Record outcomes for words leased by `owner`.
+
+        Returns:
+            Number of outcomes accepted. Outcomes for leases that were lost are dropped.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.executemany(
+                """
+                UPDATE tasks
+                SET state = ?, reason = ?, latency = ?,
+                    owner = NULL, lease_expires = NULL, updated = ?
+                WHERE provider = ? AND word = ? AND owner = ? AND state = ?
+                """,
+                (
+                    (
+                        record.status,
+                        record.reason,
+                        record.latency,
+                        now,
+                        provider,
+                        record.word,
+                        owner,
+                        LEASED,
+                    )
+                    for record in records
+                ),
+            )
+            conn.execute("COMMIT")
+        return cursor.rowcount
+
+    def release(self, provider: str, owner: str, words: Iterable[str]) -> int:
+        """Give leased words back without an outcome, e.g. on shutdown"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.executemany(
+                """
+                UPDATE tasks
+                SET state = ?, owner = NULL, lease_expires = NULL,
+                    attempts = attempts - 1, updated = ?
+                WHERE provider = ? AND word = ? AND owner = ? AND state = ?
+                """,
+                ((PENDING, now, provider, word, owner, LEASED) for word in words),
+            )
+        return cursor.rowcount
+
+    def counts(self, provider: str | None = None) -> dict[str, int]:
+        """Number of words per state, leases past their expiry are counted as pending"""
+        now = time.time()
+        query = """
+            SELECT CASE WHEN state = ? AND lease_expires < ? THEN ? ELSE state END,
+                   COUNT(*)
+            FROM tasks
+        """
+        params: tuple = (LEASED, now, PENDING)
+        if provider is not None:
+            query += " WHERE provider = ?"
+            params += (provider,)
+        query += " GROUP BY 1"
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with closing(self._connect()) as conn:
+            for state, count in conn.execute(query, params):
+                counts[state] += count
+        return counts
+
+    def providers(self) -> list[str]:
+        with closing(self._connect()) as conn:
+            return [p for (p,) in conn.execute("SELECT DISTINCT provider FROM tasks")]
+
+    def failed(self, provider: str) -> list[tuple[str, str]]:
+        """(word, reason) of every failed word for a provider"""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT word, reason FROM tasks WHERE provider = ? AND state = ?",
+                (provider, FAILED),
+            ).fetchall()